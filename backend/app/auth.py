@@ -2,10 +2,14 @@ from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from concurrent.futures import ProcessPoolExecutor
+import asyncio, multiprocessing, time
 from . import models, database
+from .cache import TTLCache
+from .config import settings
 
 # SECRET KEY is handled by install.sh in production
 SECRET_KEY = "CHANGE_THIS_TO_A_REALLY_LONG_RANDOM_STRING_FOR_PROD"
@@ -14,15 +18,84 @@ ALGORITHM = "HS256"
 # FEATURE: Never logout automatically (10 Years)
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 365 * 10 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes below bcrypt_rounds are flagged by needs_update and upgraded on the next successful login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds, bcrypt__min_rounds=settings.bcrypt_rounds)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password, hashed_password):
+    # (valid, replacement hash or None)
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+# --- Password hashing pool ---
+# bcrypt costs hundreds of ms of CPU, so it runs in a dedicated process pool instead of the shared
+# request threadpool. Only the event loop touches _hash_pending, so it needs no lock.
+_hash_pool = None
+_hash_pending = 0
+
+async def _run_hash(fn, *args):
+    global _hash_pool, _hash_pending
+    if _hash_pending >= settings.hash_queue_limit:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many sign-ins in progress, try again shortly", headers={"Retry-After": "1"})
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(max_workers=settings.hash_workers, mp_context=multiprocessing.get_context("spawn"))
+    _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_pool, fn, *args)
+    finally:
+        _hash_pending -= 1
+
+async def hash_password_async(password):
+    return await _run_hash(get_password_hash, password)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await _run_hash(verify_and_update_password, plain_password, hashed_password)
+
+def shutdown_hash_pool():
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(cancel_futures=True)
+        _hash_pool = None
+
+# --- Login throttling ---
+class LoginThrottle:
+    # Sliding window of failed attempts per key, checked before any bcrypt work is queued
+    def __init__(self, max_failures: int, window: int):
+        self.max_failures = max_failures
+        self.window = window
+        self._failures = TTLCache(maxsize=10000, ttl=window)
+
+    def _recent(self, key):
+        cutoff = time.time() - self.window
+        return [t for t in (self._failures.get(key) or []) if t > cutoff]
+
+    def check(self, key):
+        recent = self._recent(key)
+        if len(recent) >= self.max_failures:
+            retry_after = int(recent[0] + self.window - time.time()) + 1
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many failed attempts, try again later", headers={"Retry-After": str(retry_after)})
+
+    def fail(self, key):
+        self._failures.set(key, self._recent(key) + [time.time()])
+
+    def reset(self, key):
+        self._failures.pop(key)
+
+user_throttle = LoginThrottle(settings.login_max_failures_user, settings.login_failure_window)
+ip_throttle = LoginThrottle(settings.login_max_failures_ip, settings.login_failure_window)
+
+def client_ip(request: Request) -> str:
+    # nginx proxies from loopback and passes the real address in X-Real-IP
+    host = request.client.host if request.client else ""
+    if host in ("127.0.0.1", "::1"):
+        return request.headers.get("x-real-ip", host)
+    return host
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -33,21 +106,65 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+# --- Current user ---
+class UserSnapshot:
+    # Detached copy of a User row, safe to share across requests and sessions.
+    # Endpoints that modify the user must load the row themselves and call invalidate_user().
+    __slots__ = ("id", "username", "currency", "ntfy_url", "ntfy_topic")
+
+    def __init__(self, user: models.User):
+        for name in self.__slots__:
+            setattr(self, name, getattr(user, name))
+
+# token -> (subject, exp): repeated requests with the same bearer token skip signature verification
+_token_cache = TTLCache(maxsize=settings.auth_cache_size, ttl=settings.auth_token_cache_ttl)
+# username -> UserSnapshot: skips the per-request users lookup. Per process: after a settings change the other
+# workers keep their snapshot for up to auth_user_cache_ttl seconds (bounded staleness, kept short on purpose).
+_user_cache = TTLCache(maxsize=settings.auth_cache_size, ttl=settings.auth_user_cache_ttl)
+
+def _decode_subject(token: str) -> Optional[str]:
+    cached = _token_cache.get(token)
+    if cached is None:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        cached = (payload.get("sub"), payload.get("exp"))
+        _token_cache.set(token, cached)
+    username, exp = cached
+    if exp is not None and exp <= time.time():
+        _token_cache.pop(token)
+        raise JWTError("Signature has expired")
+    return username
+
+def invalidate_user(username: str):
+    _user_cache.pop(username)
+
+def cache_stats() -> dict:
+    return {"tokens": _token_cache.stats(), "users": _user_cache.stats()}
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_read_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
+        username = _decode_subject(token)
         if username is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    user = db.query(models.User).filter(models.User.username == username).first()
+    user = _user_cache.get(username)
     if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        db_user = db.query(models.User).filter(models.User.username == username).first()
+        if db_user is None:
+            raise credentials_exception
+        user = UserSnapshot(db_user)
+        _user_cache.set(username, user)
+    return user
+
+ADMINS = {name.strip() for name in settings.admin_users.split(",") if name.strip()}
+
+async def get_admin_user(current_user: UserSnapshot = Depends(get_current_user)):
+    if current_user.username not in ADMINS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only")
+    return current_user
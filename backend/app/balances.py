@@ -0,0 +1,58 @@
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from . import models
+
+# Stored running totals: card_statements.paid_amount / is_paid and lending.returned_amount / is_settled.
+# Routers call add_payment()/add_return() in the same transaction as every payment or return they insert
+# (amount) or delete (-amount). Each is one atomic "col = col + ?" UPDATE that recomputes the flag from the new
+# total, so concurrent writes cannot lose an update and no child rows are loaded. Deleting a statement or
+# lending takes its children with it, so that needs no call.
+
+def add_payment(db: Session, statement_id: int, amount: float):
+    S = models.CardStatement
+    paid = func.coalesce(S.paid_amount, 0.0) + amount
+    db.execute(update(S).where(S.id == statement_id).values(paid_amount=paid, is_paid=paid >= S.total_due))
+
+def add_return(db: Session, lending_id: int, amount: float):
+    L = models.Lending
+    returned = func.coalesce(L.returned_amount, 0.0) + amount
+    db.execute(update(L).where(L.id == lending_id).values(returned_amount=returned, is_settled=returned >= L.total_amount))
+
+def _paid_sum():
+    P = models.StatementPayment
+    return select(func.coalesce(func.sum(P.amount), 0.0)).where(P.statement_id == models.CardStatement.id).scalar_subquery()
+
+def _returned_sum():
+    R = models.LendingReturn
+    return select(func.coalesce(func.sum(R.amount), 0.0)).where(R.lending_id == models.Lending.id).scalar_subquery()
+
+def _with_payments():
+    # Statements from before payments were itemised carry a paid_amount with no rows behind it; those are left as is
+    return select(models.StatementPayment.id).where(models.StatementPayment.statement_id == models.CardStatement.id).exists()
+
+def _owned_statements(owner_id: int):
+    return models.CardStatement.card_id.in_(select(models.Card.id).where(models.Card.owner_id == owner_id))
+
+def rebuild(db: Session, owner_id: int = None):
+    # Recompute the stored totals from the payment / return rows
+    S, L = models.CardStatement, models.Lending
+    statements = update(S).where(_with_payments()).values(paid_amount=_paid_sum(), is_paid=_paid_sum() >= S.total_due)
+    lendings = update(L).values(returned_amount=_returned_sum(), is_settled=_returned_sum() >= L.total_amount)
+    if owner_id is not None:
+        statements = statements.where(_owned_statements(owner_id))
+        lendings = lendings.where(L.owner_id == owner_id)
+    db.execute(statements.execution_options(synchronize_session=False))
+    db.execute(lendings.execution_options(synchronize_session=False))
+
+def check(db: Session, owner_id: int = None):
+    # -> [(table, id, stored, expected)] where a stored total disagrees with its rows
+    S, L = models.CardStatement, models.Lending
+    statements = select(S.id, S.paid_amount, _paid_sum()).where(_with_payments())
+    lendings = select(L.id, L.returned_amount, _returned_sum())
+    if owner_id is not None:
+        statements = statements.where(_owned_statements(owner_id))
+        lendings = lendings.where(L.owner_id == owner_id)
+    return [(table, row_id, stored, expected)
+            for table, query in (("card_statements", statements), ("lending", lendings))
+            for row_id, stored, expected in db.execute(query)
+            if abs((stored or 0.0) - expected) > 1e-6]
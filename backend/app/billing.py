@@ -0,0 +1,122 @@
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+from datetime import date, datetime, timedelta
+import calendar, threading
+from . import models, versions
+from .cache import TTLCache
+from .config import settings
+
+# Per-card billing cycle, outstanding balance and utilization for GET /api/cards/utilization.
+# billed = the latest statement's total_due less its paid_amount (the running total of its payments);
+# unbilled = expenses less credits dated inside the current cycle; emi_remaining = EMI principal from this cycle on
+# (an EMI purchase blocks its full amount but is billed installment by installment, so it is not in unbilled);
+# outstanding = billed + unbilled + emi_remaining.
+# Results are cached per card; routers call invalidate() after committing a write that touches a card's
+# transactions, statements or payments. The cycle is part of the cached value, so a rollover is a miss.
+# invalidate() only reaches this process, so entries are also stamped with the user's cards/transactions
+# collection versions (versions.py): a write through another worker changes the stamp and misses here too.
+
+_cache = TTLCache(maxsize=settings.billing_cache_size, ttl=settings.billing_cache_ttl)
+# Bumped by invalidate(); a computation that started before a bump must not be cached
+_generation = {}
+_lock = threading.Lock()
+
+def _statement_day(year: int, month: int, day: int) -> date:
+    return date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+def _shift_month(year: int, month: int, n: int):
+    month += n
+    return year + (month - 1) // 12, (month - 1) % 12 + 1
+
+def cycle(statement_date: int, today: date = None):
+    # -> (start, end) datetimes, end exclusive. The cycle closes on the statement day, so it runs from the
+    # day after the previous statement day through the next one; without a statement day it is the calendar month.
+    today = today or date.today()
+    if not statement_date:
+        start = today.replace(day=1)
+        end = date(*_shift_month(today.year, today.month, 1), 1)
+    else:
+        close = _statement_day(today.year, today.month, statement_date)
+        offset = 0 if today <= close else 1
+        end = _statement_day(*_shift_month(today.year, today.month, offset), statement_date) + timedelta(days=1)
+        start = _statement_day(*_shift_month(today.year, today.month, offset - 1), statement_date) + timedelta(days=1)
+    return datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time())
+
+def compute(db: Session, cards, today: date = None) -> dict:
+    # cards: Card rows of one owner -> {card_id: utilization dict}; one query per table however many cards
+    if not cards: return {}
+    T, Stmt, Installment = models.Transaction, models.CardStatement, models.EmiInstallment
+    cycles = {card.id: cycle(card.statement_date, today) for card in cards}
+    ids = list(cycles)
+
+    cycle_start = case({card_id: start for card_id, (start, _) in cycles.items()}, value=T.card_id)
+    cycle_end = case({card_id: end for card_id, (_, end) in cycles.items()}, value=T.card_id)
+    signed = case((T.type == "credit", -T.amount), else_=T.amount)
+    # Same condition as emi.schedule(): these are billed through their installments
+    scheduled = (T.is_emi == True) & (T.emi_months > 0) & (T.type != "credit")
+    unbilled = dict(db.execute(
+        select(T.card_id, func.coalesce(func.sum(signed), 0.0))
+        .where(T.card_id.in_(ids), T.date >= cycle_start, T.date < cycle_end, ~func.coalesce(scheduled, False)).group_by(T.card_id)
+    ).all())
+
+    installment_cycle_start = case({card_id: start for card_id, (start, _) in cycles.items()}, value=Installment.card_id)
+    emi_remaining = dict(db.execute(
+        select(Installment.card_id, func.sum(Installment.amount))
+        .where(Installment.card_id.in_(ids), Installment.due_date >= installment_cycle_start).group_by(Installment.card_id)
+    ).all())
+
+    latest = select(
+        Stmt.card_id, Stmt.total_due, func.coalesce(Stmt.paid_amount, 0.0).label("paid"), Stmt.due_date,
+        func.row_number().over(partition_by=Stmt.card_id, order_by=(Stmt.generated_date.desc(), Stmt.id.desc())).label("n")
+    ).where(Stmt.card_id.in_(ids)).subquery()
+    statements = {row.card_id: row for row in db.execute(select(latest).where(latest.c.n == 1))}
+
+    result = {}
+    for card in cards:
+        stmt = statements.get(card.id)
+        billed = (stmt.total_due or 0.0) - stmt.paid if stmt else 0.0
+        outstanding = billed + unbilled.get(card.id, 0.0) + emi_remaining.get(card.id, 0.0)
+        limit = card.limit or 0.0
+        result[card.id] = {
+            "card_id": card.id,
+            "name": card.name,
+            "limit": limit,
+            "cycle_start": cycles[card.id][0],
+            "cycle_end": cycles[card.id][1] - timedelta(days=1),
+            "due_date": stmt.due_date if stmt else None,
+            "billed": billed,
+            "unbilled": unbilled.get(card.id, 0.0),
+            "emi_remaining": emi_remaining.get(card.id, 0.0),
+            "outstanding": outstanding,
+            "available": max(limit - max(outstanding, 0.0), 0.0),
+            "utilization": round(max(outstanding, 0.0) / limit * 100, 2) if limit > 0 else None,
+        }
+    return result
+
+def for_user(db: Session, owner_id: int) -> list:
+    cards = db.query(models.Card).filter(models.Card.owner_id == owner_id).order_by(models.Card.id).all()
+    today = date.today()
+    stamp = versions.stamp(db, owner_id, "cards", "transactions")
+    result, missing = {}, []
+    for card in cards:
+        cached_stamp, cached = _cache.get(card.id) or (None, None)
+        # The limit and statement day live on the card row, so a card edit is a miss too
+        if cached_stamp == stamp and cached["cycle_start"] == cycle(card.statement_date, today)[0] and cached["limit"] == (card.limit or 0.0) and cached["name"] == card.name:
+            result[card.id] = cached
+        else:
+            missing.append(card)
+    if missing:
+        with _lock: generations = {card.id: _generation.get(card.id, 0) for card in missing}
+        fresh = compute(db, missing, today)
+        with _lock:
+            for card_id, value in fresh.items():
+                if _generation.get(card_id, 0) == generations[card_id]: _cache.set(card_id, (stamp, value))
+        result.update(fresh)
+    return [result[card.id] for card in cards]
+
+def invalidate(*card_ids):
+    with _lock:
+        for card_id in card_ids:
+            if card_id is None: continue
+            _generation[card_id] = _generation.get(card_id, 0) + 1
+            _cache.pop(card_id)
@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import sys
+from . import balances, database, migrations, models, reminders, rollups, search, storage, summary, versions
+
+# Maintenance commands, run from the backend directory:  python -m app.cli <command>
+
+def _users(db, username):
+    q = db.query(models.User)
+    if username: q = q.filter(models.User.username == username)
+    return q.all()
+
+def migrate(args):
+    if args.status:
+        waiting = migrations.pending()
+        for version, name in waiting: print(f"pending {version}: {name}")
+        print(f"{len(waiting)} migration(s) pending")
+        return 1 if waiting else 0
+    applied = migrations.run()
+    for name in applied: print(f"applied {name}")
+    print(f"Applied {len(applied)} migration(s)" if applied else "Schema up to date")
+
+def rebuild_summary(args):
+    db = database.SessionLocal()
+    try:
+        users = _users(db, args.user)
+        for user in users:
+            summary.rebuild(db, user.id)
+        db.commit()
+        print(f"Rebuilt summary for {len(users)} user(s)")
+    finally:
+        db.close()
+
+def check_summary(args):
+    db = database.SessionLocal()
+    try:
+        mismatches = []
+        for user in _users(db, args.user):
+            mismatches += summary.check(db, user.id)
+        for user_id, field, stored, expected in mismatches:
+            print(f"user {user_id}: {field} stored={stored} expected={expected}")
+        print("Summary OK" if not mismatches else f"{len(mismatches)} mismatch(es), run rebuild-summary to fix")
+        return 1 if mismatches else 0
+    finally:
+        db.close()
+
+def rebuild_rollups(args):
+    db = database.SessionLocal()
+    try:
+        users = _users(db, args.user)
+        for user in users:
+            rollups.rebuild(db, user.id)
+        db.commit()
+        print(f"Rebuilt analytics rollups for {len(users)} user(s)")
+    finally:
+        db.close()
+
+def check_rollups(args):
+    db = database.SessionLocal()
+    try:
+        mismatches = []
+        for user in _users(db, args.user):
+            mismatches += [(user.id, *m) for m in rollups.check(db, user.id)]
+        for user_id, dimension, year_month, key, stored, expected in mismatches:
+            print(f"user {user_id}: {dimension} {year_month} {key} stored={stored} expected={expected}")
+        print("Rollups OK" if not mismatches else f"{len(mismatches)} mismatch(es), run rebuild-rollups to fix")
+        return 1 if mismatches else 0
+    finally:
+        db.close()
+
+def rebuild_balances(args):
+    db = database.SessionLocal()
+    try:
+        users = _users(db, args.user)
+        for user in users:
+            # Settled flags may change with the totals, and with them the dashboard counters and cached lists
+            balances.rebuild(db, user.id)
+            summary.rebuild(db, user.id)
+            versions.bump(db, user.id, "cards", "lending")
+        db.commit()
+        print(f"Rebuilt payment and return balances for {len(users)} user(s)")
+    finally:
+        db.close()
+
+def check_balances(args):
+    db = database.SessionLocal()
+    try:
+        mismatches = []
+        for user in _users(db, args.user):
+            mismatches += balances.check(db, user.id)
+        for table, row_id, stored, expected in mismatches:
+            print(f"{table} {row_id}: stored={stored} expected={expected}")
+        print("Balances OK" if not mismatches else f"{len(mismatches)} mismatch(es), run rebuild-balances to fix")
+        return 1 if mismatches else 0
+    finally:
+        db.close()
+
+def rebuild_search(args):
+    search.rebuild(database.engine)
+    print(f"Rebuilt full-text indexes: {', '.join(fts for fts, _, _ in search.INDEXES.values())}")
+
+def send_reminders(args):
+    if args.dry_run:
+        with database.ReadSessionLocal() as db:
+            _, pending = reminders.collect(db)
+        for r in pending: print(f"user {r.owner_id}: {r.kind} {r.item_id} {r.text}")
+        print(f"{len(pending)} reminder(s) due (already sent ones included)")
+        return
+
+    async def run():
+        try: return await reminders.run_once()
+        finally: await reminders.stop()
+    result = asyncio.run(run())
+    print(f"Sent {result['sent']} reminder(s), {result['failed']} failed")
+    return 1 if result["failed"] else 0
+
+def _size(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB": return f"{n:.1f} {unit}"
+        n /= 1024
+
+def gc_uploads(args):
+    db = database.SessionLocal()
+    try:
+        removed, freed = storage.collect_garbage(db, dry_run=args.dry_run)
+        for name in removed: print(name)
+        print(f"{'Would remove' if args.dry_run else 'Removed'} {len(removed)} unreferenced file(s), {_size(freed)}")
+    finally:
+        db.close()
+
+def dedupe_uploads(args):
+    db = database.SessionLocal()
+    try:
+        renamed, freed = storage.dedupe_legacy(db)
+        print(f"Moved {renamed} legacy file(s) to content-addressed names, freed {_size(freed)}")
+    finally:
+        db.close()
+
+def disk_usage(args):
+    db = database.SessionLocal()
+    try:
+        usage = storage.usage_by_user(db)
+        for user in _users(db, args.user):
+            count, total = usage.get(user.id, (0, 0))
+            print(f"{user.username:<24} {count:>6} file(s) {_size(total):>10}")
+    finally:
+        db.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="CC-Track maintenance commands")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("migrate", help="Apply pending schema migrations (run before starting the workers)")
+    p.add_argument("--status", action="store_true", help="Only list pending migrations; exit 1 if there are any")
+    p.set_defaults(func=migrate)
+
+    p = sub.add_parser("rebuild-summary", help="Recompute dashboard summary rows from the source tables")
+    p.add_argument("--user", help="Only this username")
+    p.set_defaults(func=rebuild_summary)
+
+    p = sub.add_parser("check-summary", help="Compare dashboard summary rows against a full recompute")
+    p.add_argument("--user", help="Only this username")
+    p.set_defaults(func=check_summary)
+
+    p = sub.add_parser("rebuild-rollups", help="Recompute monthly analytics rollups from the source tables")
+    p.add_argument("--user", help="Only this username")
+    p.set_defaults(func=rebuild_rollups)
+
+    p = sub.add_parser("check-rollups", help="Compare monthly analytics rollups against a full recompute")
+    p.add_argument("--user", help="Only this username")
+    p.set_defaults(func=check_rollups)
+
+    p = sub.add_parser("rebuild-balances", help="Recompute stored statement paid and lending returned totals from their rows")
+    p.add_argument("--user", help="Only this username")
+    p.set_defaults(func=rebuild_balances)
+
+    p = sub.add_parser("check-balances", help="Compare stored paid / returned totals against their rows")
+    p.add_argument("--user", help="Only this username")
+    p.set_defaults(func=check_balances)
+
+    p = sub.add_parser("rebuild-search", help="Recreate the full-text search indexes from the source tables")
+    p.set_defaults(func=rebuild_search)
+
+    p = sub.add_parser("send-reminders", help="Run one reminder scan and deliver to ntfy now")
+    p.add_argument("--dry-run", action="store_true", help="Only list what is due")
+    p.set_defaults(func=send_reminders)
+
+    p = sub.add_parser("gc-uploads", help="Delete upload files no row references any more")
+    p.add_argument("--dry-run", action="store_true", help="Only list what would be removed")
+    p.set_defaults(func=gc_uploads)
+
+    p = sub.add_parser("dedupe-uploads", help="Rename legacy uploads to their content hash, merging duplicates")
+    p.set_defaults(func=dedupe_uploads)
+
+    p = sub.add_parser("disk-usage", help="Upload storage used per user")
+    p.add_argument("--user", help="Only this username")
+    p.set_defaults(func=disk_usage)
+
+    args = parser.parse_args(argv)
+    if args.func is not migrate: migrations.run()
+    return args.func(args) or 0
+
+if __name__ == "__main__":
+    sys.exit(main())
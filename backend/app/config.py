@@ -0,0 +1,85 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+import os
+
+# Backend root (the folder holding app/, cc_track.db and uploads/)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class Settings(BaseSettings):
+    # Every field can be overridden with a CC_TRACK_<NAME> environment variable or backend/.env
+    model_config = SettingsConfigDict(env_prefix="CC_TRACK_", env_file=os.path.join(BASE_DIR, ".env"), extra="ignore")
+
+    database_url: str = f"sqlite:///{os.path.join(BASE_DIR, 'cc_track.db')}"
+    # Apply pending migrations at app startup (single process / dev); gunicorn runs them once before forking
+    auto_migrate: bool = True
+    # gunicorn.conf.py: listen address and worker processes
+    bind: str = "127.0.0.1:8000"
+    workers: int = 2
+    # WAL + pragmas, one writer connection and a read-only pool; False restores the stock engine
+    sqlite_tuning: bool = True
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout: int = 5000
+    sqlite_cache_kb: int = 32 * 1024
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    db_read_pool_size: int = 4
+    db_pool_timeout: int = 30
+
+    # Auth caches: decoded bearer tokens and the user snapshot behind each token subject. invalidate_user() only
+    # reaches its own worker, so auth_user_cache_ttl is how long other workers may serve old settings.
+    auth_cache_size: int = 1024
+    auth_token_cache_ttl: int = 60 * 60
+    auth_user_cache_ttl: int = 5
+    # Per-card outstanding / utilization results (invalidated on writes; the TTL only bounds staleness)
+    billing_cache_size: int = 4096
+    billing_cache_ttl: int = 10 * 60
+
+    # Password hashing runs in its own process pool; logins beyond the queue limit get a fast 429
+    bcrypt_rounds: int = 12
+    hash_workers: int = 2
+    hash_queue_limit: int = 16
+    # Failed logins allowed per username / per client IP within the window (seconds)
+    login_max_failures_user: int = 5
+    login_max_failures_ip: int = 20
+    login_failure_window: int = 15 * 60
+
+    # Uploads
+    upload_dir: str = os.path.join(BASE_DIR, "uploads")
+    upload_chunk_size: int = 1024 * 1024
+    max_image_size: int = 10 * 1024 * 1024
+    max_document_size: int = 25 * 1024 * 1024
+    # Unreferenced blobs younger than this are left alone (they may be mid-request)
+    upload_gc_grace: int = 15 * 60
+
+    # Statement import: largest accepted file and rows per INSERT batch / transaction
+    max_import_size: int = 50 * 1024 * 1024
+    import_batch_size: int = 500
+    # Rows fetched per round trip while streaming GET /api/export
+    export_batch_size: int = 1000
+    # Smallest /api response (bytes) worth gzipping
+    gzip_min_size: int = 1024
+
+    # Reminder scheduler: scan interval (seconds), how far ahead to look for due statements and renewals,
+    # and how often to nag about an unsettled loan
+    reminders_enabled: bool = True
+    reminder_interval: int = 15 * 60
+    reminder_lead_days: int = 3
+    lending_reminder_days: int = 30
+    # ntfy delivery: shared connection pool, per-request timeout (seconds), retries with exponential backoff
+    ntfy_max_connections: int = 10
+    ntfy_timeout: float = 10.0
+    ntfy_retries: int = 3
+    ntfy_backoff: float = 1.0
+
+    # Request metrics at GET /metrics; a request repeating one SQL statement this many times is logged as an N+1
+    metrics_enabled: bool = True
+    n_plus_one_threshold: int = 10
+    # Usernames (comma-separated) allowed to use /api/admin
+    admin_users: str = ""
+    # Request profiling (switchable at runtime through /api/admin/profiling): fraction of requests sampled,
+    # stack sampling interval (seconds) and how many profiles the ring buffer in profile_dir keeps
+    profiling_enabled: bool = False
+    profile_sample_rate: float = 0.0
+    profile_interval: float = 0.005
+    profile_dir: str = os.path.join(BASE_DIR, "profiles")
+    profile_keep: int = 50
+
+settings = Settings()
@@ -1,23 +1,94 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
-import os
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from .config import settings
 
-# Ensure the database file is stored in the backend root
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, 'cc_track.db')}"
+# Defaults to cc_track.db in the backend root (CC_TRACK_DATABASE_URL overrides)
+SQLALCHEMY_DATABASE_URL = settings.database_url
+# Same file through aiosqlite, for the async endpoints
+ASYNC_DATABASE_URL = make_url(SQLALCHEMY_DATABASE_URL).set(drivername="sqlite+aiosqlite")
 
-# connect_args={"check_same_thread": False} is needed for SQLite
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+def _sqlite_pragmas(read_only: bool):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL lets readers run alongside the writer; it is persistent, so repeating it is a no-op
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout}")
+        cursor.execute(f"PRAGMA cache_size=-{settings.sqlite_cache_kb}")
+        cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        else:
+            # Let SQLAlchemy emit BEGIN itself (see _begin_immediate)
+            dbapi_connection.isolation_level = None
+        cursor.close()
+    return on_connect
+
+def _begin_immediate(conn):
+    # The sync and async writers are two connections. Taking the write lock at BEGIN makes the second one
+    # wait in busy_timeout, instead of failing with "database is locked" when a read-then-write
+    # transaction tries to upgrade a stale snapshot.
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+def _listen(sync_engine, read_only: bool):
+    event.listen(sync_engine, "connect", _sqlite_pragmas(read_only))
+    if not read_only:
+        event.listen(sync_engine, "begin", _begin_immediate)
+
+def _create_engine(pool_size: int, max_overflow: int = 0, read_only: bool = False):
+    # connect_args={"check_same_thread": False} is needed for SQLite
+    if not settings.sqlite_tuning:
+        return create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, pool_size=pool_size, max_overflow=max_overflow, pool_timeout=settings.db_pool_timeout)
+    if engine.dialect.name == "sqlite":
+        _listen(engine, read_only)
+    return engine
+
+def _create_async_engine():
+    if not settings.sqlite_tuning:
+        return create_async_engine(ASYNC_DATABASE_URL)
+    engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0, pool_timeout=settings.db_pool_timeout)
+    _listen(engine.sync_engine, read_only=False)
+    return engine
+
+# Sync writes share one connection (and async writes one more, below), so SQLite never has a crowd of writers
+# in this process fighting over the lock; read-only endpoints use a separate pool that WAL lets run concurrently with it. Readers never wait for a
+# connection (overflow is unbounded, pool_size is just how many stay open) because async endpoints check
+# them out on the event loop.
+engine = _create_engine(pool_size=1)
+read_engine = _create_engine(pool_size=settings.db_read_pool_size, max_overflow=-1, read_only=True) if settings.sqlite_tuning else engine
+
+# Async endpoints write through their own connection: aiosqlite runs each statement in its worker thread
+# and the pool hands the connection out with an awaitable wait, so nothing here blocks the event loop.
+async_engine = _create_async_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+# expire_on_commit=False: an expired attribute would lazy-load, which an AsyncSession can't do implicitly
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
 def get_db():
+    # For sync (def) endpoints only, which run in the threadpool: the session takes the single writer at its
+    # first statement and hands it back at commit, so uploads, parsing and response rendering don't hold it.
+    # Async endpoints use get_async_db; a lazy checkout there would wait for the writer on the event loop.
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
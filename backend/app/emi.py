@@ -0,0 +1,47 @@
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+from datetime import datetime
+import calendar
+from . import models
+
+# EMI schedules, stored one row per installment in emi_installments so "what hits my cards next month"
+# is an indexed range query. Routers call sync()/remove() in the same transaction as the EMI transaction's
+# write. No interest rate is recorded, so the principal is split evenly; the last installment takes the rounding.
+
+def add_months(when: datetime, n: int) -> datetime:
+    month = when.month - 1 + n
+    year, month = when.year + month // 12, month % 12 + 1
+    return when.replace(year=year, month=month, day=min(when.day, calendar.monthrange(year, month)[1]))
+
+def schedule(tx) -> list:
+    # First installment falls a month after the purchase, with the next statement
+    if not tx.is_emi or not tx.emi_months or tx.emi_months < 1 or not tx.amount or tx.type == "credit": return []
+    months, total = tx.emi_months, round(tx.amount, 2)
+    installment = round(total / months, 2)
+    start = tx.date or datetime.now()
+    rows, remaining = [], total
+    for number in range(1, months + 1):
+        amount = installment if number < months else round(remaining, 2)
+        remaining = round(remaining - amount, 2)
+        rows.append({
+            "owner_id": tx.owner_id, "transaction_id": tx.id, "card_id": tx.card_id, "number": number,
+            "due_date": add_months(start, number), "amount": amount, "remaining_principal": remaining,
+        })
+    return rows
+
+def remove(db: Session, transaction_id: int):
+    db.execute(delete(models.EmiInstallment).where(models.EmiInstallment.transaction_id == transaction_id))
+
+def sync(db: Session, tx):
+    # tx must have its id (flush first when it is new)
+    remove(db, tx.id)
+    rows = schedule(tx)
+    if rows: db.execute(insert(models.EmiInstallment), rows)
+
+def backfill(db: Session) -> int:
+    # Schedules for EMI transactions created before the table existed
+    T, I = models.Transaction, models.EmiInstallment
+    missing = db.query(T).filter(T.is_emi == True, T.emi_months > 0, ~select(I.id).where(I.transaction_id == T.id).exists()).all()
+    rows = [row for tx in missing for row in schedule(tx)]
+    if rows: db.execute(insert(I), rows)
+    return len(rows)
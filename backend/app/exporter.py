@@ -0,0 +1,126 @@
+from sqlalchemy import select
+from datetime import date, datetime
+from typing import Iterator
+import csv, io, json, os, time, zipfile
+from . import database, models, storage
+from .config import settings
+
+# Full-account export for GET /api/export. Every generator here opens its own read session and walks the
+# tables with yield_per, so rows go out as they are fetched and memory stays flat however long the history is.
+
+CHUNK_SIZE = 64 * 1024
+
+def _entities(owner_id: int):
+    # (name, select) in dependency order; child tables are scoped to the owner through their parent
+    Card, Stmt, Payment, Lending, Return = models.Card, models.CardStatement, models.StatementPayment, models.Lending, models.LendingReturn
+    owned = lambda model: select(*model.__table__.c).where(model.owner_id == owner_id).order_by(model.id)
+    return [
+        ("cards", owned(Card)),
+        ("card_statements", select(*Stmt.__table__.c).join(Stmt.card).where(Card.owner_id == owner_id).order_by(Stmt.id)),
+        ("statement_payments", select(*Payment.__table__.c).join(Payment.statement).join(Stmt.card).where(Card.owner_id == owner_id).order_by(Payment.id)),
+        ("transactions", owned(models.Transaction)),
+        ("lending", owned(Lending)),
+        ("lending_returns", select(*Return.__table__.c).join(Return.lending).where(Lending.owner_id == owner_id).order_by(Return.id)),
+        ("companies", owned(models.Company)),
+        ("salary", owned(models.Salary)),
+        ("subscriptions", owned(models.Subscription)),
+    ]
+
+ENTITIES = [name for name, _ in _entities(0)]
+
+def _value(value):
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+def _rows(db, stmt, paths: set = None):
+    # -> (column names, row iterator); paths collects every *_path value seen, for the attachments
+    result = db.execute(stmt.execution_options(yield_per=settings.export_batch_size))
+    columns = list(result.keys())
+    path_indexes = [i for i, name in enumerate(columns) if name.endswith("_path")]
+    def rows():
+        for row in result:
+            if paths is not None:
+                paths.update(row[i] for i in path_indexes if row[i])
+            yield [_value(v) for v in row]
+    return columns, rows()
+
+def _csv_lines(columns, rows) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def _ndjson_lines(name, columns, rows) -> Iterator[str]:
+    lines, size = [], 0
+    for row in rows:
+        line = json.dumps({"entity": name, **dict(zip(columns, row))}) + "\n"
+        lines.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield "".join(lines)
+            lines, size = [], 0
+    yield "".join(lines)
+
+def stream_csv(owner_id: int, entity: str) -> Iterator[bytes]:
+    with database.ReadSessionLocal() as db:
+        stmt = dict(_entities(owner_id))[entity]
+        for chunk in _csv_lines(*_rows(db, stmt)):
+            yield chunk.encode()
+
+def stream_ndjson(owner_id: int, entities) -> Iterator[bytes]:
+    with database.ReadSessionLocal() as db:
+        for name, stmt in _entities(owner_id):
+            if name not in entities: continue
+            for line in _ndjson_lines(name, *_rows(db, stmt)):
+                yield line.encode()
+
+class _Sink(io.RawIOBase):
+    # Write-only, unseekable target for ZipFile; the generator drains it after every write
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+def stream_zip(owner_id: int, entities, fmt: str = "csv", attachments: bool = False) -> Iterator[bytes]:
+    # ZipFile writes data descriptors when it can't seek, so entries stream without knowing their size up front
+    sink = _Sink()
+    paths = set() if attachments else None
+    with database.ReadSessionLocal() as db, zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        if fmt == "ndjson":
+            entry = zf.open("export.ndjson", "w", force_zip64=True)
+        for name, stmt in _entities(owner_id):
+            if name not in entities: continue
+            columns, rows = _rows(db, stmt, paths)
+            if fmt == "csv":
+                entry = zf.open(f"{name}.csv", "w", force_zip64=True)
+            for text in (_csv_lines(columns, rows) if fmt == "csv" else _ndjson_lines(name, columns, rows)):
+                entry.write(text.encode())
+                if sink.chunks: yield sink.drain()
+            if fmt == "csv": entry.close()
+        if fmt == "ndjson": entry.close()
+
+        for path in sorted(paths or ()):
+            full = os.path.join(storage.UPLOAD_DIR, path)
+            if os.path.basename(path) != path or path.startswith(".") or not os.path.isfile(full):
+                continue
+            # Uploads are images and PDFs, already compressed
+            info = zipfile.ZipInfo(f"uploads/{path}", time.localtime(os.path.getmtime(full))[:6])
+            with open(full, "rb") as f, zf.open(info, "w", force_zip64=True) as entry:
+                while chunk := f.read(CHUNK_SIZE):
+                    entry.write(chunk)
+                    if sink.chunks: yield sink.drain()
+    yield sink.drain()
@@ -0,0 +1,184 @@
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Dict, Iterator, Optional, TextIO, Tuple
+import csv, itertools, re
+from . import billing, database, models, rollups, summary, versions
+from .config import settings
+
+# Bank / card statement import for POST /api/transactions/import.
+# Parsers yield (row number, record) one row at a time, so a year of statements is never held in memory;
+# valid rows are inserted in executemany batches, one short writer transaction per batch.
+
+MAX_ERRORS = 100
+PREVIEW_ROWS = 20
+
+# Normalised header -> record field. Covers the usual Indian bank / card exports plus generic names.
+HEADER_ALIASES = {
+    "date": {"date", "transaction date", "txn date", "tran date", "value date", "posting date", "posted date", "trans date"},
+    "description": {"description", "narration", "details", "particulars", "transaction details", "remarks", "memo", "payee", "name", "merchant"},
+    "amount": {"amount", "transaction amount", "amt", "amount (inr)", "amount(inr)", "billing amount"},
+    "debit": {"debit", "debit amount", "withdrawal", "withdrawal amt", "withdrawal amount", "dr amount"},
+    "credit": {"credit", "credit amount", "deposit", "deposit amt", "deposit amount", "cr amount"},
+    "type": {"type", "dr/cr", "cr/dr", "debit/credit", "transaction type", "txn type"},
+    "card": {"card", "card number", "card no", "card last4", "last4"},
+    "merchant_location": {"location", "merchant location", "city", "merchant city"},
+    "payment_mode": {"payment mode", "mode", "channel"},
+}
+HEADER_FIELDS = {alias: field for field, aliases in HEADER_ALIASES.items() for alias in aliases}
+
+# Day-first before month-first: the app defaults to INR and Indian banks export dd/mm/yyyy
+DATE_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d/%m/%y", "%d-%m-%y", "%d %b %Y", "%d-%b-%Y", "%d %b %y", "%d-%b-%y", "%d %B %Y", "%Y/%m/%d", "%m/%d/%Y")
+
+EXPENSE_WORDS = {"dr", "debit", "withdrawal", "expense", "purchase", "pos", "atm"}
+CREDIT_WORDS = {"cr", "credit", "deposit", "refund", "reversal", "cashback"}
+
+OFX_TAG = re.compile(r"<(\w+)>([^<\r\n]*)")
+
+def _normalise(header: str) -> str:
+    return " ".join(header.replace("_", " ").replace(".", "").strip().lower().split())
+
+def parse_date(value: str, date_format: str = None) -> datetime:
+    value = (value or "").strip()
+    if not value: raise ValueError("missing date")
+    if date_format: return datetime.strptime(value, date_format)
+    try: return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError: pass
+    for fmt in DATE_FORMATS:
+        try: return datetime.strptime(value, fmt)
+        except ValueError: continue
+    raise ValueError(f"unrecognised date {value!r}")
+
+def parse_amount(value: str) -> Optional[float]:
+    # "1,234.50", "₹ 1,234.50 Dr", "(99.00)", "-12", "99,00" -> signed float; blank -> None
+    raw = (value or "").strip()
+    if not raw: return None
+    sign = 1
+    lowered = raw.lower()
+    if lowered.endswith(("dr", "cr")):
+        sign = -1 if lowered.endswith("dr") else 1
+        raw = raw[:-2].strip()
+    if raw.startswith("(") and raw.endswith(")"):
+        sign, raw = -sign, raw[1:-1]
+    if raw.rfind(",") > raw.rfind(".") and re.search(r",\d{1,2}$", raw):
+        # Decimal comma ("99,00", "1.234,56"); "1,00,000" and "1,000" are digit grouping
+        raw = raw.replace(".", "").replace(",", ".")
+    cleaned = re.sub(r"[^\d.\-]", "", raw)
+    try: amount = float(cleaned)
+    except ValueError: raise ValueError(f"unrecognised amount {value!r}")
+    return sign * amount
+
+def _sniff(sample: str) -> csv.Dialect:
+    try: return csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error: return csv.excel
+
+def read_delimited(stream: TextIO) -> Iterator[Tuple[int, Dict[str, str]]]:
+    # Banks often put account details above the header, so the header is the first row naming a date and an amount
+    head = list(itertools.islice(stream, 30))
+    reader = csv.reader(itertools.chain(head, stream), _sniff("".join(head)))
+    columns = None
+    for row in reader:
+        fields = [HEADER_FIELDS.get(_normalise(cell)) for cell in row]
+        if "date" in fields and ({"amount", "debit", "credit"} & set(fields)):
+            columns = fields
+            break
+        if reader.line_num >= len(head): break
+    if columns is None:
+        raise ValueError("No header row with a date and an amount column found")
+    for row in reader:
+        if not any(cell.strip() for cell in row): continue
+        yield reader.line_num, {field: cell for field, cell in zip(columns, row) if field}
+
+def read_ofx(stream: TextIO) -> Iterator[Tuple[int, Dict[str, str]]]:
+    # OFX 1.x is SGML (leaf tags unclosed) and 2.x is XML; both close each <STMTTRN> aggregate
+    buffer, account, n = "", None, 0
+    for chunk in iter(lambda: stream.read(settings.upload_chunk_size), ""):
+        buffer += chunk
+        while (end := buffer.upper().find("</STMTTRN>")) != -1:
+            block, buffer = buffer[:end], buffer[end + len("</STMTTRN>"):]
+            tags = {tag.upper(): value.strip() for tag, value in OFX_TAG.findall(block)}
+            if "<CCACCTFROM>" in block.upper(): account = tags.get("ACCTID")
+            n += 1
+            yield n, {
+                "date": (tags.get("DTPOSTED") or "")[:8],
+                "amount": tags.get("TRNAMT", ""),
+                "description": tags.get("NAME") or tags.get("MEMO") or "",
+                "card": account or "",
+            }
+
+def open_statement(stream: TextIO):
+    # -> (format name, row iterator, date format the format implies)
+    head = stream.read(4096).upper()
+    stream.seek(0)
+    if "<OFX" in head or "OFXHEADER" in head:
+        return "ofx", read_ofx(stream), "%Y%m%d"
+    return "csv", read_delimited(stream), None
+
+def build_transaction(record: Dict[str, str], owner_id: int, cards: Dict[str, int], card_id: int = None, payment_mode: str = "online", positive_is_expense: bool = False, date_format: str = None) -> dict:
+    debit, credit = parse_amount(record.get("debit")), parse_amount(record.get("credit"))
+    if debit:
+        amount, tx_type = abs(debit), "expense"
+    elif credit:
+        amount, tx_type = abs(credit), "credit"
+    else:
+        signed = parse_amount(record.get("amount"))
+        if not signed: raise ValueError("missing or zero amount")
+        declared = _normalise(record.get("type") or "")
+        if declared in EXPENSE_WORDS: tx_type = "expense"
+        elif declared in CREDIT_WORDS: tx_type = "credit"
+        else: tx_type = "expense" if (signed > 0) == positive_is_expense else "credit"
+        amount = abs(signed)
+
+    card = re.sub(r"\D", "", record.get("card") or "")[-4:]
+    if card:
+        if card not in cards: raise ValueError(f"no card ending in {card}")
+        card_id = cards[card]
+
+    return {
+        "owner_id": owner_id,
+        "card_id": card_id,
+        "description": (record.get("description") or "").strip() or "Imported transaction",
+        "amount": amount,
+        "date": parse_date(record.get("date"), date_format),
+        "type": tx_type,
+        "merchant_location": (record.get("merchant_location") or "").strip() or None,
+        "payment_mode": (record.get("payment_mode") or "").strip().lower() or payment_mode,
+        "is_emi": False,
+    }
+
+def _insert_batch(write_session, owner_id: int, batch):
+    # One short writer transaction per batch
+    with write_session() as db:
+        db.execute(insert(models.Transaction), batch)
+        summary.apply(db, owner_id, transaction_count=len(batch))
+        rollups.apply_transactions(db, owner_id, after=[rollups.tx_state(models.Transaction(**values)) for values in batch])
+        versions.bump(db, owner_id, "transactions")
+        db.commit()
+    billing.invalidate(*{values["card_id"] for values in batch})
+
+def import_statement(db: Session, owner_id: int, stream: TextIO, card_id: int = None, payment_mode: str = "online", positive_is_expense: bool = False, date_format: str = None, dry_run: bool = False, write_session=None) -> dict:
+    # db (a read session) does the lookups while the statement is parsed; only each batch insert opens a
+    # write_session (a session factory), so the writer is free between batches
+    write_session = write_session or database.SessionLocal
+    cards = dict(db.query(models.Card.card_number_last4, models.Card.id).filter(models.Card.owner_id == owner_id).all())
+    fmt, rows, native_date_format = open_statement(stream)
+    result = {"format": fmt, "dry_run": dry_run, "imported": 0, "failed": 0, "errors": [], "preview": []}
+    batch = []
+    for row, record in rows:
+        try:
+            values = build_transaction(record, owner_id, cards, card_id, payment_mode, positive_is_expense, native_date_format or date_format)
+        except ValueError as e:
+            result["failed"] += 1
+            if len(result["errors"]) < MAX_ERRORS: result["errors"].append({"row": row, "error": str(e)})
+            continue
+        result["imported"] += 1
+        if dry_run:
+            if len(result["preview"]) < PREVIEW_ROWS: result["preview"].append(values)
+            continue
+        batch.append(values)
+        if len(batch) >= settings.import_batch_size:
+            _insert_batch(write_session, owner_id, batch)
+            batch = []
+    if batch:
+        _insert_batch(write_session, owner_id, batch)
+    return result
@@ -1,14 +1,15 @@
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from .database import engine, Base
-from .routers import auth, dashboard, cards, transactions, lending, subscriptions, settings, salary
+from sqlalchemy import text
+from . import auth as auth_core, database, metrics, migrations, profiling, reminders, storage
+from .config import settings as app_settings
+from .responses import ApiGZipMiddleware
+from .routers import admin, auth, dashboard, cards, transactions, lending, subscriptions, settings, salary, uploads, export, analytics, installments, search
 import os
 
-# Create tables on startup
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(title="CC-Track", version="2.2")
+app = FastAPI(title="CC-Track", version="2.2", default_response_class=ORJSONResponse)
 
 # CORS - Allow frontend to talk to backend
 origins = [
@@ -25,13 +26,19 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Compress JSON responses above the threshold (brotli would need another dependency; gzip is what every client sends)
+app.add_middleware(ApiGZipMiddleware, minimum_size=app_settings.gzip_min_size)
+# Switched off by default; when off it is one flag check per request
+app.add_middleware(profiling.ProfilingMiddleware)
+# Outermost, so latency covers the whole stack and response sizes are what goes over the wire
+if app_settings.metrics_enabled:
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.instrument_engine(database.engine, "write")
+    if database.read_engine is not database.engine: metrics.instrument_engine(database.read_engine, "read")
+    metrics.instrument_engine(database.async_engine.sync_engine, "async")
 
 # Ensure uploads directory exists
-UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "uploads")
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-# Mount Uploads for viewing proofs
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+os.makedirs(storage.UPLOAD_DIR, exist_ok=True)
 
 # Include Routers
 app.include_router(auth.router, prefix="/auth", tags=["Auth"])
@@ -42,6 +49,46 @@ app.include_router(lending.router, prefix="/api/lending", tags=["Lending"])
 app.include_router(subscriptions.router, prefix="/api/subscriptions", tags=["Subscriptions"])
 app.include_router(settings.router, prefix="/api/settings", tags=["Settings"])
 app.include_router(salary.router, prefix="/api/salary", tags=["Salary"])
+app.include_router(export.router, prefix="/api/export", tags=["Export"])
+app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
+app.include_router(installments.router, prefix="/api/installments", tags=["EMI"])
+app.include_router(search.router, prefix="/api/search", tags=["Search"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
+# Uploads (proofs, statements, logos) with ?size=thumb|preview derivatives, ETags and Range support
+app.include_router(uploads.router, prefix="/uploads", tags=["Uploads"])
+
+@app.on_event("startup")
+async def startup():
+    # Schema changes live in migrations.py; when they already ran (gunicorn's on_starting, cli migrate) this is one SELECT
+    if app_settings.auto_migrate: await run_in_threadpool(migrations.run)
+    reminders.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await reminders.stop()
+    auth_core.shutdown_hash_pool()
+    await database.async_engine.dispose()
+
+# Prometheus scrape target (text exposition format)
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    if not app_settings.metrics_enabled: return PlainTextResponse("metrics disabled\n", status_code=404)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Liveness: the process is serving. Readiness: the database answers and the schema is current.
+@app.get("/health", include_in_schema=False)
+async def health():
+    return {"status": "ok"}
+
+@app.get("/ready", include_in_schema=False)
+def ready():
+    try:
+        with database.read_engine.connect() as conn: conn.execute(text("SELECT 1"))
+        waiting = migrations.pending()
+    except Exception as e:
+        return ORJSONResponse({"status": "unavailable", "detail": str(e)}, status_code=503)
+    if waiting: return ORJSONResponse({"status": "migrations pending", "pending": [name for _, name in waiting]}, status_code=503)
+    return {"status": "ready"}
 
 @app.get("/")
 def read_root():
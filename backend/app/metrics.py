@@ -0,0 +1,172 @@
+from contextvars import ContextVar
+from collections import Counter as Tally
+import logging, threading, time
+from .config import settings
+
+# Request instrumentation exposed at GET /metrics in the Prometheus text format. MetricsMiddleware times every
+# HTTP request and labels it with the route template; SQLAlchemy cursor events (instrument_engine) count and
+# time the statements each request runs, and a route that repeats one statement n_plus_one_threshold times
+# or more is logged as a likely N+1. Kept dependency-free: a few counters and histograms behind locks.
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+class _Metric:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._lock = threading.Lock()
+
+    def _label_text(self, values, le: str = None) -> str:
+        pairs = [(k, str(v)) for k, v in zip(self.labels, values)] + ([("le", le)] if le is not None else [])
+        if not pairs: return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [f"{self.name}{self._label_text(k)} {v:g}" for k, v in sorted(self._values.items())]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [per-bucket counts..., sum, count]
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None: entry = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound: entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def samples(self):
+        lines = []
+        with self._lock:
+            for labels, entry in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, entry):
+                    lines.append(f"{self.name}_bucket{self._label_text(labels, format(bound, 'g'))} {count}")
+                lines.append(f"{self.name}_bucket{self._label_text(labels, '+Inf')} {entry[-1]}")
+                lines.append(f"{self.name}_sum{self._label_text(labels)} {entry[-2]:g}")
+                lines.append(f"{self.name}_count{self._label_text(labels)} {entry[-1]}")
+        return lines
+
+REGISTRY = []
+
+def _register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+requests_total = _register(Counter("cc_track_http_requests_total", "HTTP requests by route and status", ("method", "route", "status")))
+request_seconds = _register(Histogram("cc_track_http_request_duration_seconds", "HTTP request latency", ("method", "route")))
+request_bytes = _register(Histogram("cc_track_http_request_size_bytes", "HTTP request body size", ("method", "route"), SIZE_BUCKETS))
+response_bytes = _register(Histogram("cc_track_http_response_size_bytes", "HTTP response body size (after compression)", ("method", "route"), SIZE_BUCKETS))
+in_progress = _register(Gauge("cc_track_http_requests_in_progress", "HTTP requests being served"))
+queries_per_request = _register(Histogram("cc_track_db_queries_per_request", "SQL statements run by one request", ("method", "route"), QUERY_BUCKETS))
+query_seconds_per_request = _register(Histogram("cc_track_db_query_seconds_per_request", "Time one request spent in SQL", ("method", "route")))
+query_seconds = _register(Histogram("cc_track_db_query_duration_seconds", "SQL statement latency", ("engine",)))
+n_plus_one_total = _register(Counter("cc_track_db_n_plus_one_total", "Requests that repeated one SQL statement n_plus_one_threshold times or more", ("method", "route")))
+upload_bytes = _register(Histogram("cc_track_upload_size_bytes", "Stored upload size", ("kind",), SIZE_BUCKETS))
+upload_seconds = _register(Histogram("cc_track_upload_duration_seconds", "Time to stream an upload to disk", ("kind",)))
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.kind}", *metric.samples()]
+    return "\n".join(lines) + "\n"
+
+# --- SQL ---
+class _RequestStats:
+    __slots__ = ("count", "seconds", "statements")
+
+    def __init__(self):
+        self.count, self.seconds, self.statements = 0, 0.0, Tally()
+
+_current: ContextVar[_RequestStats] = ContextVar("cc_track_request_stats", default=None)
+
+def instrument_engine(engine, name: str):
+    # engine: a sync Engine (for AsyncEngine pass .sync_engine)
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("cc_track_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["cc_track_query_start"].pop()
+        query_seconds.observe(elapsed, name)
+        stats = _current.get()
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += elapsed
+            stats.statements[statement] += 1
+
+# --- HTTP ---
+def _route_label(scope) -> str:
+    # The route template ("/api/cards/{card_id}"), so label values stay bounded
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        stats = _RequestStats()
+        token = _current.set(stats)
+        sizes = {"request": 0, "response": 0, "status": 500}
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request": sizes["request"] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start": sizes["status"] = message["status"]
+            elif message["type"] == "http.response.body": sizes["response"] += len(message.get("body", b""))
+            await send(message)
+
+        in_progress.inc(amount=1)
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            in_progress.inc(amount=-1)
+            _current.reset(token)
+            method, route = scope["method"], _route_label(scope)
+            requests_total.inc(method, route, str(sizes["status"]))
+            request_seconds.observe(time.perf_counter() - start, method, route)
+            request_bytes.observe(sizes["request"], method, route)
+            response_bytes.observe(sizes["response"], method, route)
+            queries_per_request.observe(stats.count, method, route)
+            query_seconds_per_request.observe(stats.seconds, method, route)
+            if stats.statements:
+                statement, repeats = stats.statements.most_common(1)[0]
+                if repeats >= settings.n_plus_one_threshold:
+                    n_plus_one_total.inc(method, route)
+                    log.warning("possible N+1 on %s %s: %d identical statements: %s", method, route, repeats, " ".join(statement.split())[:200])
@@ -0,0 +1,78 @@
+from sqlalchemy import inspect, insert, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from datetime import datetime
+import logging
+from . import balances, database, emi, models, search
+
+# Versioned schema changes, applied in order and recorded in schema_migrations. They run once per database before
+# the workers start (gunicorn's on_starting hook or `python -m app.cli migrate`); with auto_migrate on, app startup
+# runs them too, which costs one SELECT once everything is applied. Each step has its own write transaction
+# (BEGIN IMMEDIATE), so two processes migrating at once serialize and the second finds nothing left to do.
+# Append new steps; never edit or renumber one that has shipped. A fresh database gets the current models from
+# the baseline, so later steps must tolerate their change already being there.
+
+log = logging.getLogger(__name__)
+
+def _create_indexes(conn: Connection, names=None):
+    # Looked up in sqlite_master rather than with checkfirst, which can't see expression indexes
+    existing = set(conn.scalars(text("SELECT name FROM sqlite_master WHERE type = 'index'")))
+    for table in database.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name not in existing and (names is None or index.name in names): index.create(bind=conn)
+
+def _baseline(conn: Connection):
+    # create_all skips tables that already exist, so indexes added to old tables are created one by one
+    database.Base.metadata.create_all(bind=conn)
+    _create_indexes(conn)
+
+def _indexes(*names):
+    # Step creating the named indexes as declared in models.py
+    return lambda conn: _create_indexes(conn, names)
+
+def _emi_schedules(conn: Connection):
+    # Installments for EMI purchases recorded before emi_installments existed
+    emi.backfill(Session(bind=conn))
+
+def _stored_balances(conn: Connection):
+    # lending.returned_amount, then every stored payment / return total recomputed from its rows once
+    if "returned_amount" not in {c["name"] for c in inspect(conn).get_columns("lending")}:
+        conn.execute(text("ALTER TABLE lending ADD COLUMN returned_amount FLOAT DEFAULT 0.0"))
+    balances.rebuild(Session(bind=conn))
+
+MIGRATIONS = [
+    (1, "baseline schema", _baseline),
+    (2, "full-text search indexes", search.ensure),
+    (3, "emi installment schedules", _emi_schedules),
+    # Owner filters and foreign-key joins of every router (checked by bench/audit_indexes.py)
+    (4, "owner and foreign key indexes", _indexes(
+        "ix_cards_owner_id", "ix_card_statements_card_generated", "ix_statement_payments_statement_id", "ix_companies_owner_joining",
+        "ix_salary_company_date_added", "ix_salary_owner_date_added", "ix_transactions_card_date", "ix_lending_owner_settled",
+        "ix_lending_returns_lending_id", "ix_subscriptions_owner_active")),
+    (5, "stored lending and payment balances", _stored_balances),
+    (6, "transaction keyset index for undated rows", _indexes("ix_transactions_owner_sort_date_id")),
+]
+
+def pending(engine=None) -> list:
+    # [(version, name)] not yet applied, oldest first
+    M = models.SchemaMigration
+    with (engine or database.read_engine).connect() as conn:
+        done = set(conn.scalars(select(M.version))) if inspect(conn).has_table(M.__tablename__) else set()
+    return [(version, name) for version, name, _ in MIGRATIONS if version not in done]
+
+def run(engine=None) -> list:
+    # Applies whatever is pending; returns the names applied
+    engine = engine or database.engine
+    if not pending(engine): return []
+    M = models.SchemaMigration
+    with engine.begin() as conn:
+        M.__table__.create(bind=conn, checkfirst=True)
+    applied = []
+    for version, name, step in MIGRATIONS:
+        with engine.begin() as conn:
+            if conn.scalar(select(M.version).where(M.version == version)) is not None: continue
+            log.info("applying migration %d: %s", version, name)
+            step(conn)
+            conn.execute(insert(M).values(version=version, name=name, applied_at=datetime.utcnow()))
+        applied.append(name)
+    return applied
@@ -1,8 +1,16 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Text
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Text, Index, UniqueConstraint, func, literal_column
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
 
+# Transactions without a date (legacy and some imported rows) sort as the epoch, i.e. after everything else.
+# Inlined rather than bound so the expression index below matches the listing query.
+UNDATED = datetime(1970, 1, 1)
+_UNDATED_SQL = literal_column(f"'{UNDATED:%Y-%m-%d %H:%M:%S.%f}'")
+
+def sort_date(date_column):
+    return func.coalesce(date_column, _UNDATED_SQL)
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -12,6 +20,41 @@ class User(Base):
     ntfy_url = Column(String, nullable=True)
     ntfy_topic = Column(String, nullable=True)
 
+class UserSummary(Base):
+    # Dashboard counters, maintained incrementally by the routers (see summary.py)
+    __tablename__ = "user_summary"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    card_count = Column(Integer, default=0)
+    transaction_count = Column(Integer, default=0)
+    active_lending_count = Column(Integer, default=0)
+    pending_lending_amount = Column(Float, default=0.0)
+    monthly_subs = Column(Float, default=0.0)
+    last_salary = Column(Float, default=0.0)
+
+class SchemaMigration(Base):
+    # One row per applied step of migrations.MIGRATIONS
+    __tablename__ = "schema_migrations"
+    version = Column(Integer, primary_key=True)
+    name = Column(String)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
+class CollectionVersion(Base):
+    # Bumped by every write to a collection; list endpoints derive their ETag from it (see versions.py)
+    __tablename__ = "collection_versions"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    collection = Column(String, primary_key=True)
+    version = Column(Integer, default=0)
+
+class MonthlyRollup(Base):
+    # Per-month analytics totals, maintained incrementally by the routers (see rollups.py)
+    __tablename__ = "monthly_rollups"
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    dimension = Column(String, primary_key=True)  # card, payment_mode, type, emi, income
+    year_month = Column(String, primary_key=True)  # "YYYY-MM"
+    key = Column(String, primary_key=True)
+    amount = Column(Float, default=0.0)
+    count = Column(Integer, default=0)
+
 class Card(Base):
     __tablename__ = "cards"
     id = Column(Integer, primary_key=True, index=True)
@@ -33,17 +76,19 @@ class Card(Base):
     back_image_path = Column(String, nullable=True)
     statements = relationship("CardStatement", back_populates="card", cascade="all, delete-orphan")
 
+    __table_args__ = (Index("ix_cards_owner_id", owner_id, id),)
+
 class CardStatement(Base):
     __tablename__ = "card_statements"
     id = Column(Integer, primary_key=True, index=True)
     card_id = Column(Integer, ForeignKey("cards.id"))
     month = Column(String)
     generated_date = Column(DateTime)
-    due_date = Column(DateTime)
+    due_date = Column(DateTime, index=True)
     total_due = Column(Float)
     min_due = Column(Float, default=0.0)
     is_paid = Column(Boolean, default=False)
-    paid_amount = Column(Float, default=0.0) # Calculated Sum
+    paid_amount = Column(Float, default=0.0) # Running total of payments (balances.add_payment)
     paid_date = Column(DateTime, nullable=True) # Last payment date
     payment_ref = Column(String, nullable=True) # Legacy field
     attachment_path = Column(String, nullable=True) # Statement PDF
@@ -52,10 +97,13 @@ class CardStatement(Base):
     card = relationship("Card", back_populates="statements")
     payments = relationship("StatementPayment", back_populates="statement", cascade="all, delete-orphan")
 
+    # Statements of a card; billing takes the latest by generated_date
+    __table_args__ = (Index("ix_card_statements_card_generated", card_id, generated_date),)
+
 class StatementPayment(Base):
     __tablename__ = "statement_payments"
     id = Column(Integer, primary_key=True, index=True)
-    statement_id = Column(Integer, ForeignKey("card_statements.id"))
+    statement_id = Column(Integer, ForeignKey("card_statements.id"), index=True)
     amount = Column(Float)
     date = Column(DateTime, default=datetime.now)
     reference = Column(String, nullable=True)
@@ -73,6 +121,8 @@ class Company(Base):
     is_current = Column(Boolean, default=False)
     salaries = relationship("Salary", back_populates="company", cascade="all, delete-orphan")
 
+    __table_args__ = (Index("ix_companies_owner_joining", owner_id, joining_date),)
+
 class Salary(Base):
     __tablename__ = "salary"
     id = Column(Integer, primary_key=True, index=True)
@@ -85,6 +135,12 @@ class Salary(Base):
     date_added = Column(DateTime, default=datetime.now)
     company = relationship("Company", back_populates="salaries")
 
+    # Slips of a company newest first; the dashboard's last salary is the owner's newest slip
+    __table_args__ = (
+        Index("ix_salary_company_date_added", company_id, date_added),
+        Index("ix_salary_owner_date_added", owner_id, date_added),
+    )
+
 class Transaction(Base):
     __tablename__ = "transactions"
     id = Column(Integer, primary_key=True, index=True)
@@ -100,6 +156,31 @@ class Transaction(Base):
     emi_months = Column(Integer, nullable=True)
     attachment_path = Column(String, nullable=True)
 
+    # Keyset pagination walks (sort_date DESC, id) within one owner; date filters and billing's current cycle
+    # are range scans on the plain date
+    __table_args__ = (
+        Index("ix_transactions_owner_date_id", owner_id, date.desc(), id),
+        Index("ix_transactions_owner_sort_date_id", owner_id, sort_date(date).desc(), id),
+        Index("ix_transactions_card_date", card_id, date),
+    )
+
+class EmiInstallment(Base):
+    # Amortization schedule of an EMI transaction, regenerated by emi.sync() whenever the transaction changes
+    __tablename__ = "emi_installments"
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"))
+    transaction_id = Column(Integer, ForeignKey("transactions.id"), index=True)
+    card_id = Column(Integer, ForeignKey("cards.id"), nullable=True)
+    number = Column(Integer)  # 1-based
+    due_date = Column(DateTime)
+    amount = Column(Float)
+    remaining_principal = Column(Float)  # still to be billed after this installment
+
+    __table_args__ = (
+        Index("ix_emi_installments_owner_due", owner_id, due_date),
+        Index("ix_emi_installments_card_due", card_id, due_date),
+    )
+
 class Lending(Base):
     __tablename__ = "lending"
     id = Column(Integer, primary_key=True, index=True)
@@ -107,13 +188,20 @@ class Lending(Base):
     total_amount = Column(Float)
     lent_date = Column(DateTime, default=datetime.now)
     is_settled = Column(Boolean, default=False)
+    returned_amount = Column(Float, default=0.0) # Running total of returns (balances.add_return)
     owner_id = Column(Integer, ForeignKey("users.id"))
     returns = relationship("LendingReturn", back_populates="lending", cascade="all, delete-orphan")
 
+    # The reminder scan walks unsettled loans by age; the routers and dashboard filter one owner's (open) loans
+    __table_args__ = (
+        Index("ix_lending_settled_lent_date", is_settled, lent_date),
+        Index("ix_lending_owner_settled", owner_id, is_settled),
+    )
+
 class LendingReturn(Base):
     __tablename__ = "lending_returns"
     id = Column(Integer, primary_key=True, index=True)
-    lending_id = Column(Integer, ForeignKey("lending.id"))
+    lending_id = Column(Integer, ForeignKey("lending.id"), index=True)
     amount = Column(Float)
     return_date = Column(DateTime, default=datetime.now)
     proof_image_path = Column(String, nullable=True)
@@ -125,7 +213,21 @@ class Subscription(Base):
     name = Column(String)
     amount = Column(Float)
     active = Column(Boolean, default=True)
-    renewal_date = Column(DateTime, nullable=True)
+    renewal_date = Column(DateTime, nullable=True, index=True)
     frequency = Column(String, default="Monthly")
     logo_path = Column(String, nullable=True)
-    owner_id = Column(Integer, ForeignKey("users.id"))
\ No newline at end of file
+    owner_id = Column(Integer, ForeignKey("users.id"))
+
+    __table_args__ = (Index("ix_subscriptions_owner_active", owner_id, active),)
+
+class ReminderLog(Base):
+    # One row per reminder sent; the unique key makes each (item, due date) go out once (see reminders.py)
+    __tablename__ = "reminder_log"
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
+    kind = Column(String)  # "statement" | "subscription" | "lending"
+    item_id = Column(Integer)
+    due_date = Column(DateTime)
+    sent_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (UniqueConstraint("kind", "item_id", "due_date", name="uq_reminder_log_item"),)
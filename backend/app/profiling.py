@@ -0,0 +1,126 @@
+from collections import Counter as Tally
+from datetime import datetime
+from typing import Optional
+import asyncio, contextlib, os, random, re, sys, threading, time
+from .config import settings
+
+# Opt-in request profiling. While an admin has it switched on, ProfilingMiddleware samples sample_rate of
+# requests (plus any carrying the X-Profile header) with a stack-sampling thread: every profile_interval it
+# records the stack of every busy thread, which covers sync endpoints in the threadpool as well as the event
+# loop. Samples are process-wide, so concurrent requests can show up in a profile; only one request is profiled
+# at a time. Output is folded stacks (speedscope / flamegraph.pl) in a ring buffer of profile_keep files under
+# profile_dir. When switched off the middleware is a single flag check.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+HEADER = b"x-profile"
+NAME = re.compile(r"^[\w.-]+\.folded$")
+# Top frames of a thread that is only waiting for work (idle pool workers, the loop in select)
+IDLE_FILES = ("threading.py", "queue.py", "selectors.py", os.path.join("futures", "thread.py"))
+
+state = {"enabled": settings.profiling_enabled, "sample_rate": settings.profile_sample_rate}
+_active = threading.Lock()
+
+def configure(enabled: bool, sample_rate: Optional[float] = None):
+    state["enabled"] = enabled
+    if sample_rate is not None: state["sample_rate"] = sample_rate
+
+def _label(code) -> str:
+    parts = code.co_filename.replace("\\", "/").rsplit("/", 2)
+    return f"{'/'.join(parts[-2:])}:{code.co_name}"
+
+class _Sampler(threading.Thread):
+    def __init__(self, interval: float):
+        super().__init__(name="cc-track-profiler", daemon=True)
+        self.interval, self.stacks, self.samples = interval, Tally(), 0
+        self._done = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self._done.wait(self.interval):
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == me: continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                if stack[0].co_filename.endswith(IDLE_FILES) and not any(code.co_filename.startswith(APP_DIR) for code in stack): continue
+                self.stacks[";".join(_label(code) for code in reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+# --- Ring buffer ---
+def _write(name: str, header: dict, stacks: Tally):
+    os.makedirs(settings.profile_dir, exist_ok=True)
+    tmp = os.path.join(settings.profile_dir, f".{name}.tmp")
+    with open(tmp, "w") as f:
+        for key, value in header.items(): f.write(f"# {key}: {value}\n")
+        for stack, count in stacks.most_common(): f.write(f"{stack} {count}\n")
+    os.replace(tmp, os.path.join(settings.profile_dir, name))
+    for old in list_profiles()[settings.profile_keep:]:
+        # Workers share profile_dir, so another one may be rotating the same file out
+        with contextlib.suppress(FileNotFoundError): os.remove(os.path.join(settings.profile_dir, old["name"]))
+
+def _read_header(path: str) -> dict:
+    header = {}
+    with open(path) as f:
+        for line in f:
+            if not line.startswith("# "): break
+            key, _, value = line[2:].rstrip("\n").partition(": ")
+            header[key] = value
+    return header
+
+def list_profiles() -> list:
+    # Newest first (names start with a sortable timestamp)
+    if not os.path.isdir(settings.profile_dir): return []
+    names = sorted((n for n in os.listdir(settings.profile_dir) if NAME.match(n)), reverse=True)
+    profiles = []
+    for name in names:
+        path = os.path.join(settings.profile_dir, name)
+        try:
+            profiles.append({"name": name, "size": os.path.getsize(path), **_read_header(path)})
+        except FileNotFoundError:
+            continue  # rotated out meanwhile
+    return profiles
+
+def profile_path(name: str) -> Optional[str]:
+    path = os.path.join(settings.profile_dir, name)
+    return path if NAME.match(name) and os.path.isfile(path) else None
+
+# --- Middleware ---
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not state["enabled"] or scope["type"] != "http" or scope["path"].startswith("/api/admin"):
+            return await self.app(scope, receive, send)
+        forced = any(key == HEADER for key, _ in scope["headers"])
+        if not forced and random.random() >= state["sample_rate"] or not _active.acquire(blocking=False):
+            return await self.app(scope, receive, send)
+
+        now = datetime.now()
+        slug = re.sub(r"[^\w]+", "_", scope["path"]).strip("_")[:60] or "root"
+        name = f"{now:%Y%m%dT%H%M%S%f}-{scope['method']}-{slug}.folded"
+        status = {"code": 500}
+
+        async def tagged_send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", name.encode())]}
+            await send(message)
+
+        sampler = _Sampler(settings.profile_interval)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, tagged_send)
+        finally:
+            sampler.stop()
+            _active.release()
+            header = {"method": scope["method"], "path": scope["path"], "status": status["code"], "started": now.isoformat(timespec="milliseconds"),
+                      "duration_ms": round((time.perf_counter() - start) * 1000, 2), "samples": sampler.samples,
+                      "interval_ms": settings.profile_interval * 1000, "trigger": "header" if forced else "sample"}
+            await asyncio.to_thread(_write, name, header, sampler.stacks)
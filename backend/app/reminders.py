@@ -0,0 +1,193 @@
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from collections import namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import make_url
+import asyncio, logging, os
+import httpx
+from . import database, models
+from .config import settings
+
+# In-process reminder scheduler. Every reminder_interval seconds it scans for unpaid statements and renewals
+# due within reminder_lead_days and loans left unsettled for another lending_reminder_days, then sends each
+# user one ntfy message listing their reminders. Items are claimed in reminder_log (unique per item and due
+# date) before sending and released again if delivery fails, so a reminder goes out at most once and a
+# failed one is retried on the next scan, even with several workers scanning.
+
+log = logging.getLogger(__name__)
+
+Reminder = namedtuple("Reminder", "owner_id kind item_id due_date text")
+Recipient = namedtuple("Recipient", "ntfy_url ntfy_topic currency")
+
+_client: httpx.AsyncClient = None
+_task: asyncio.Task = None
+_leader_file = None
+
+# --- Delivery ---
+def client() -> httpx.AsyncClient:
+    # One pooled client per process, shared by the scheduler and the test endpoint
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=settings.ntfy_timeout,
+            limits=httpx.Limits(max_connections=settings.ntfy_max_connections, max_keepalive_connections=settings.ntfy_max_connections),
+        )
+    return _client
+
+async def send(ntfy_url: str, topic: str, message: str, title: str = "CC-Track", tags: str = None, retries: int = None) -> httpx.Response:
+    # Retries connection errors, timeouts, 429 and 5xx with exponential backoff; other statuses are final.
+    # retries defaults to ntfy_retries (the background scan); interactive callers pass 0 to answer promptly.
+    retries = settings.ntfy_retries if retries is None else retries
+    headers = {"Title": title}
+    if tags: headers["Tags"] = tags
+    url = f"{ntfy_url.rstrip('/')}/{topic}"
+    for attempt in range(retries + 1):
+        try:
+            resp = await client().post(url, content=message.encode("utf-8"), headers=headers)
+            if resp.status_code != 429 and resp.status_code < 500: return resp
+            error = httpx.HTTPStatusError(f"ntfy returned {resp.status_code}", request=resp.request, response=resp)
+        except httpx.TransportError as e:
+            error = e
+        if attempt < retries:
+            await asyncio.sleep(settings.ntfy_backoff * 2 ** attempt)
+    raise error
+
+# --- Scan ---
+def _money(currency: str, amount: float) -> str:
+    return f"{currency or 'INR'} {amount or 0:,.2f}"
+
+def collect(db: Session, now: datetime = None):
+    # -> ({owner_id: Recipient}, [Reminder]) for users with ntfy configured; range scans on the indexed dates
+    now = now or datetime.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    horizon = today + timedelta(days=settings.reminder_lead_days + 1)
+    U, Card, Stmt, Sub, Lending = models.User, models.Card, models.CardStatement, models.Subscription, models.Lending
+    configured = (U.ntfy_url != None) & (U.ntfy_url != "") & (U.ntfy_topic != None) & (U.ntfy_topic != "")
+    recipients, reminders = {}, []
+
+    def add(user, kind, item_id, due_date, text):
+        recipients[user.id] = Recipient(user.ntfy_url, user.ntfy_topic, user.currency)
+        reminders.append(Reminder(user.id, kind, item_id, due_date, text))
+
+    q = db.query(Stmt, Card.name, U).join(Card, Card.id == Stmt.card_id).join(U, U.id == Card.owner_id).filter(
+        configured, Stmt.is_paid == False, Stmt.due_date >= today, Stmt.due_date < horizon)
+    for stmt, card_name, user in q:
+        left = (stmt.total_due or 0.0) - (stmt.paid_amount or 0.0)
+        add(user, "statement", stmt.id, stmt.due_date, f"{card_name} statement ({stmt.month}): {_money(user.currency, left)} due {stmt.due_date:%d %b}")
+
+    q = db.query(Sub, U).join(U, U.id == Sub.owner_id).filter(
+        configured, Sub.active == True, Sub.renewal_date >= today, Sub.renewal_date < horizon)
+    for sub, user in q:
+        add(user, "subscription", sub.id, sub.renewal_date, f"{sub.name} renews {sub.renewal_date:%d %b}: {_money(user.currency, sub.amount)}")
+
+    # A loan is due again every lending_reminder_days after it was lent; the latest such date is the dedupe key
+    period = timedelta(days=settings.lending_reminder_days)
+    q = db.query(Lending, U).join(U, U.id == Lending.owner_id).filter(
+        configured, Lending.is_settled == False, Lending.lent_date <= now - period)
+    for loan, user in q:
+        due_date = loan.lent_date + period * ((now - loan.lent_date) // period)
+        add(user, "lending", loan.id, due_date, f"{loan.person_name} still owes {_money(user.currency, (loan.total_amount or 0.0) - (loan.returned_amount or 0.0))} (lent {loan.lent_date:%d %b %Y})")
+    return recipients, reminders
+
+def claim(db: Session, reminders) -> list:
+    # Inserts a log row per reminder; returns the ones this call inserted, i.e. not sent (or claimed) before
+    claimed = []
+    for r in reminders:
+        result = db.execute(insert(models.ReminderLog).values(owner_id=r.owner_id, kind=r.kind, item_id=r.item_id, due_date=r.due_date, sent_at=datetime.now()).on_conflict_do_nothing())
+        if result.rowcount: claimed.append(r)
+    db.commit()
+    return claimed
+
+def release(db: Session, reminders):
+    L = models.ReminderLog
+    for r in reminders:
+        db.query(L).filter(L.kind == r.kind, L.item_id == r.item_id, L.due_date == r.due_date).delete()
+    db.commit()
+
+def _scan(now: datetime = None):
+    with database.ReadSessionLocal() as db:
+        recipients, reminders = collect(db, now)
+    if not reminders: return recipients, []
+    with database.SessionLocal() as db:
+        return recipients, claim(db, reminders)
+
+def _release(reminders):
+    with database.SessionLocal() as db:
+        release(db, reminders)
+
+def _message(reminders) -> str:
+    return "\n".join(f"• {r.text}" for r in sorted(reminders, key=lambda r: r.due_date))
+
+async def run_once(now: datetime = None) -> dict:
+    # One scan + delivery; -> {"sent": reminders delivered, "failed": reminders released for the next scan}
+    recipients, claimed = await run_in_threadpool(_scan, now)
+    by_user = {}
+    for r in claimed: by_user.setdefault(r.owner_id, []).append(r)
+
+    async def deliver(owner_id, items):
+        to = recipients[owner_id]
+        title = f"CC-Track: {len(items)} reminder{'s' if len(items) > 1 else ''}"
+        try:
+            await send(to.ntfy_url, to.ntfy_topic, _message(items), title=title, tags="bell")
+            return []
+        except Exception as e:
+            log.warning("ntfy delivery to user %s failed: %s", owner_id, e)
+            return items
+
+    failed = [r for items in await asyncio.gather(*(deliver(u, items) for u, items in by_user.items())) for r in items]
+    if failed: await run_in_threadpool(_release, failed)
+    return {"sent": len(claimed) - len(failed), "failed": len(failed)}
+
+# --- Scheduler ---
+def _lock_path() -> str:
+    # Next to the SQLite file, so every worker serving one database competes for the same lock
+    path = make_url(settings.database_url).database
+    return f"{path}.reminders.lock" if path and path != ":memory:" else os.path.join(settings.upload_dir, ".reminders.lock")
+
+def _is_leader() -> bool:
+    # With several workers only the one holding this lock scans; the OS drops it when that process exits,
+    # and the others retry every interval, so another worker takes over
+    global _leader_file
+    if _leader_file is not None: return True
+    try:
+        import fcntl
+    except ImportError:
+        return True  # no flock (Windows): every worker scans, claims still prevent duplicates
+    f = open(_lock_path(), "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return False
+    _leader_file = f
+    return True
+
+async def _loop():
+    while True:
+        try:
+            if _is_leader():
+                result = await run_once()
+                if result["sent"] or result["failed"]: log.info("reminders: %s", result)
+        except Exception:
+            log.exception("reminder scan failed")
+        await asyncio.sleep(settings.reminder_interval)
+
+def start():
+    global _task
+    if settings.reminders_enabled and _task is None:
+        _task = asyncio.create_task(_loop())
+
+async def stop():
+    global _task, _client, _leader_file
+    if _task is not None:
+        _task.cancel()
+        try: await _task
+        except asyncio.CancelledError: pass
+        _task = None
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    if _leader_file is not None:
+        _leader_file.close()
+        _leader_file = None
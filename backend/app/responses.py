@@ -0,0 +1,38 @@
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from starlette.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel
+from typing import Type
+
+# Fast path for large list responses: the endpoint selects only the columns its schema exposes, builds plain
+# dicts and hands them straight to orjson, skipping per-object Pydantic validation and jsonable_encoder.
+# The response_model stays on the route for the OpenAPI docs; it must list the same fields.
+
+def columns(schema: Type[BaseModel], model, *extra):
+    # The model columns behind the schema's scalar fields, plus any extra (e.g. a parent id for grouping)
+    table = model.__table__.c
+    return [getattr(model, name) for name in schema.model_fields if name in table] + list(extra)
+
+def rows(result) -> list:
+    return [row._asdict() for row in result]
+
+def json(content, response: Response = None) -> ORJSONResponse:
+    # Headers set on the injected Response (ETag, Cache-Control from versions.conditional) are carried over,
+    # since FastAPI drops them when an endpoint returns its own Response
+    return ORJSONResponse(content, headers=dict(response.headers) if response is not None else None)
+
+class ApiGZipMiddleware(GZipMiddleware):
+    # gzip for JSON under /api and /auth only: uploads are already-compressed images/PDFs served with Range
+    # support, and the export stream sets its own framing
+    SKIP = ("/api/export",)
+
+    def __init__(self, app, minimum_size: int = 500, compresslevel: int = 6, prefixes=("/api", "/auth")):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.prefixes = prefixes
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] == "http" and path.startswith(self.prefixes) and not path.startswith(self.SKIP):
+            await super().__call__(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
@@ -0,0 +1,133 @@
+from sqlalchemy import String, case, cast, delete, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from . import models
+
+# Monthly analytics rollups: (owner_id, dimension, year_month, key) -> (amount, count).
+# Like summary.py, routers apply deltas inside the same transaction as their write, so a five-year chart
+# reads a few hundred rows. A user without the "built" marker row is backfilled on first read; until then
+# writes skip the table rather than create partial months.
+#
+# Dimensions: card / payment_mode / emi (expenses only), type (every transaction), income (salary slips).
+
+MARKER = ("_meta", "", "built")
+NO_CARD = "none"
+
+MONTHS = {name: i for i, name in enumerate(["january", "february", "march", "april", "may", "june", "july", "august", "september", "october", "november", "december"], 1)}
+
+def salary_month(month: str, year: int):
+    # Slips store the month as a name ("January"); tolerate "Jan" and "1" too
+    raw = (month or "").strip().lower()
+    if raw.isdigit(): number = int(raw)
+    else: number = next((i for name, i in MONTHS.items() if len(raw) >= 3 and name.startswith(raw)), None)
+    if not number or not 1 <= number <= 12 or not year: return None
+    return f"{year:04d}-{number:02d}"
+
+def tx_state(tx):
+    # The fields a transaction's rollup contribution depends on; diff before/after a write
+    return (tx.date, tx.amount, tx.type, tx.card_id, tx.payment_mode, bool(tx.is_emi))
+
+def salary_state(slip):
+    return (salary_month(slip.month, slip.year), slip.amount)
+
+def _tx_contributions(state):
+    date, amount, tx_type, card_id, payment_mode, is_emi = state
+    year_month = (date or models.UNDATED).strftime("%Y-%m")  # undated rows share the epoch month, as in compute()
+    amount = amount or 0.0
+    rows = [("type", year_month, tx_type or "expense", amount)]
+    if tx_type != "credit":
+        rows += [
+            ("card", year_month, str(card_id) if card_id else NO_CARD, amount),
+            ("payment_mode", year_month, payment_mode or "unknown", amount),
+            ("emi", year_month, "emi" if is_emi else "regular", amount),
+        ]
+    return rows
+
+def _salary_contributions(state):
+    year_month, amount = state
+    return [("income", year_month, "salary", amount or 0.0)] if year_month else []
+
+def _is_built(db: Session, owner_id: int) -> bool:
+    return db.get(models.MonthlyRollup, (owner_id, *MARKER)) is not None
+
+def _upsert(db: Session, owner_id: int, deltas: dict):
+    # deltas: (dimension, year_month, key) -> (amount, count)
+    rows = [{"owner_id": owner_id, "dimension": d, "year_month": ym, "key": k, "amount": a, "count": c} for (d, ym, k), (a, c) in deltas.items() if a or c]
+    if not rows: return
+    stmt = insert(models.MonthlyRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["owner_id", "dimension", "year_month", "key"],
+        set_={"amount": models.MonthlyRollup.amount + stmt.excluded.amount, "count": models.MonthlyRollup.count + stmt.excluded.count}
+    )
+    db.execute(stmt, rows)
+
+def _accumulate(deltas: dict, contributions, sign: int):
+    for dimension, year_month, key, amount in contributions:
+        a, c = deltas.get((dimension, year_month, key), (0.0, 0))
+        deltas[(dimension, year_month, key)] = (a + sign * amount, c + sign)
+
+def apply_transactions(db: Session, owner_id: int, before=(), after=()):
+    # before/after: iterables of tx_state tuples removed / added by this write
+    if not _is_built(db, owner_id): return
+    deltas = {}
+    for state in before: _accumulate(deltas, _tx_contributions(state), -1)
+    for state in after: _accumulate(deltas, _tx_contributions(state), 1)
+    _upsert(db, owner_id, deltas)
+
+def apply_salaries(db: Session, owner_id: int, before=(), after=()):
+    if not _is_built(db, owner_id): return
+    deltas = {}
+    for state in before: _accumulate(deltas, _salary_contributions(state), -1)
+    for state in after: _accumulate(deltas, _salary_contributions(state), 1)
+    _upsert(db, owner_id, deltas)
+
+def compute(db: Session, owner_id: int) -> dict:
+    # Full recompute from the source tables: (dimension, year_month, key) -> (amount, count)
+    T = models.Transaction
+    year_month = func.strftime("%Y-%m", models.sort_date(T.date))
+    # Same keys as _tx_contributions, including its fallbacks for missing values
+    tx_type = func.coalesce(func.nullif(T.type, ""), "expense")
+    spend = tx_type != "credit"
+    keys = {
+        "type": (tx_type, True),
+        "card": (func.coalesce(cast(T.card_id, String), NO_CARD), spend),
+        "payment_mode": (func.coalesce(func.nullif(T.payment_mode, ""), "unknown"), spend),
+        "emi": (case((T.is_emi == True, "emi"), else_="regular"), spend),
+    }
+    result = {}
+    for dimension, (key, condition) in keys.items():
+        q = select(year_month, key, func.coalesce(func.sum(T.amount), 0.0), func.count()).where(T.owner_id == owner_id, condition).group_by(year_month, key)
+        for ym, k, amount, count in db.execute(q):
+            result[(dimension, ym, k)] = (amount, count)
+    deltas = {}
+    for slip in db.execute(select(models.Salary.month, models.Salary.year, models.Salary.amount).where(models.Salary.owner_id == owner_id)):
+        _accumulate(deltas, _salary_contributions((salary_month(slip.month, slip.year), slip.amount)), 1)
+    result.update(deltas)
+    return result
+
+def rebuild(db: Session, owner_id: int):
+    db.execute(delete(models.MonthlyRollup).where(models.MonthlyRollup.owner_id == owner_id))
+    rows = [{"owner_id": owner_id, "dimension": d, "year_month": ym, "key": k, "amount": a, "count": c} for (d, ym, k), (a, c) in compute(db, owner_id).items()]
+    rows.append({"owner_id": owner_id, "dimension": MARKER[0], "year_month": MARKER[1], "key": MARKER[2], "amount": 0.0, "count": 0})
+    db.execute(insert(models.MonthlyRollup), rows)
+
+def ensure(db: Session, owner_id: int, write_session):
+    # Backfill once per user; write_session is a session factory, as in summary.get
+    if _is_built(db, owner_id): return
+    with write_session() as write_db:
+        if not _is_built(write_db, owner_id):
+            rebuild(write_db, owner_id)
+            write_db.commit()
+    db.rollback()  # end the read snapshot taken before the backfill
+
+def check(db: Session, owner_id: int):
+    # Compare stored rollups against a full recompute; returns (dimension, year_month, key, stored, expected)
+    if not _is_built(db, owner_id): return []
+    stored = {(r.dimension, r.year_month, r.key): (r.amount, r.count) for r in db.query(models.MonthlyRollup).filter(models.MonthlyRollup.owner_id == owner_id, models.MonthlyRollup.dimension != MARKER[0])}
+    expected = compute(db, owner_id)
+    mismatches = []
+    for k in set(stored) | set(expected):
+        s, e = stored.get(k, (0.0, 0)), expected.get(k, (0.0, 0))
+        if abs(s[0] - e[0]) > 1e-6 or s[1] != e[1]:
+            mismatches.append((*k, s, e))
+    return sorted(mismatches)
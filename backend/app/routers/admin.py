@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from typing import List
+from .. import models, schemas, auth, profiling
+
+router = APIRouter()
+
+# --- Profiling ---
+# The switch is per process: with several workers, each one has to be switched (or set CC_TRACK_PROFILING_ENABLED)
+@router.get("/profiling", response_model=schemas.ProfilingState)
+def get_profiling(current_user: models.User = Depends(auth.get_admin_user)):
+    return profiling.state
+
+@router.put("/profiling", response_model=schemas.ProfilingState)
+def set_profiling(body: schemas.ProfilingState, current_user: models.User = Depends(auth.get_admin_user)):
+    if body.sample_rate is not None and not 0 <= body.sample_rate <= 1:
+        raise HTTPException(status_code=422, detail="sample_rate must be between 0 and 1")
+    profiling.configure(body.enabled, body.sample_rate)
+    return profiling.state
+
+@router.get("/profiles", response_model=List[schemas.ProfileInfo])
+async def list_profiles(current_user: models.User = Depends(auth.get_admin_user)):
+    return await run_in_threadpool(profiling.list_profiles)
+
+@router.get("/profiles/{name}")
+def download_profile(name: str, current_user: models.User = Depends(auth.get_admin_user)):
+    path = profiling.profile_path(name)
+    if path is None: raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=name)
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from .. import database, models, schemas, auth, rollups
+
+router = APIRouter()
+
+MONTH = r"^\d{4}-(0[1-9]|1[0-2])$"
+SPEND_DIMENSIONS = "^(card|payment_mode|type|emi)$"
+
+def _rows(db: Session, owner_id: int, dimensions, start: Optional[str], end: Optional[str]):
+    # Served from monthly_rollups (see rollups.py); backfilled from the source tables on first use
+    rollups.ensure(db, owner_id, database.SessionLocal)
+    R = models.MonthlyRollup
+    q = db.query(R).filter(R.owner_id == owner_id, R.dimension.in_(dimensions), R.count != 0)
+    if start: q = q.filter(R.year_month >= start)
+    if end: q = q.filter(R.year_month <= end)
+    return q.order_by(R.year_month, R.key).all()
+
+@router.get("/monthly", response_model=List[schemas.MonthlyPoint])
+def monthly(
+    dimension: str = Query(..., pattern=SPEND_DIMENSIONS),
+    start: Optional[str] = Query(None, pattern=MONTH), end: Optional[str] = Query(None, pattern=MONTH),
+    current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_read_db)
+):
+    # Spend per card / payment_mode / emi (expenses only) or per type (expense vs credit), one point per month and key
+    labels = {}
+    if dimension == "card":
+        labels = {str(card_id): f"{name} ({last4})" for card_id, name, last4 in db.query(models.Card.id, models.Card.name, models.Card.card_number_last4).filter(models.Card.owner_id == current_user.id)}
+        labels[rollups.NO_CARD] = "No card"
+    return [
+        {"month": r.year_month, "key": r.key, "label": labels.get(r.key, r.key), "amount": r.amount, "count": r.count}
+        for r in _rows(db, current_user.id, [dimension], start, end)
+    ]
+
+@router.get("/cashflow", response_model=List[schemas.CashFlowPoint])
+def cashflow(
+    start: Optional[str] = Query(None, pattern=MONTH), end: Optional[str] = Query(None, pattern=MONTH),
+    current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_read_db)
+):
+    # Salary income, credits and expenses per month; net = income + credits - expenses
+    months = {}
+    for r in _rows(db, current_user.id, ["income", "type"], start, end):
+        point = months.setdefault(r.year_month, {"month": r.year_month, "income": 0.0, "credits": 0.0, "expenses": 0.0})
+        if r.dimension == "income": point["income"] += r.amount
+        elif r.key == "credit": point["credits"] += r.amount
+        else: point["expenses"] += r.amount
+    for point in months.values():
+        point["net"] = point["income"] + point["credits"] - point["expenses"]
+    return list(months.values())
@@ -1,34 +1,69 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from .. import database, models, schemas, auth
 
 router = APIRouter()
 
+# Both endpoints spend most of their time in bcrypt, so they look users up on a read connection and
+# only borrow the single writer connection for the short write at the end. They are async (the hash is
+# awaited from its process pool), so every database call goes through run_in_threadpool.
+
+def _find_user(username: str):
+    with database.ReadSessionLocal() as db:
+        return db.query(models.User).filter(models.User.username == username).first()
+
+def _create_user(username: str, hashed_password: str):
+    with database.SessionLocal() as db:
+        db.add(models.User(username=username, hashed_password=hashed_password))
+        db.commit()
+
+def _store_hash(user_id: int, hashed_password: str):
+    with database.SessionLocal() as db:
+        db.query(models.User).filter(models.User.id == user_id).update({"hashed_password": hashed_password})
+        db.commit()
+
 @router.post("/signup", response_model=schemas.Token)
-def signup(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
-    db_user = db.query(models.User).filter(models.User.username == user.username).first()
-    if db_user:
+async def signup(user: schemas.UserCreate, request: Request):
+    ip = auth.client_ip(request)
+    auth.ip_throttle.check(ip)
+    if await run_in_threadpool(_find_user, user.username):
+        auth.ip_throttle.fail(ip)
+        raise HTTPException(status_code=400, detail="Username already registered")
+
+    hashed_password = await auth.hash_password_async(user.password)
+    try:
+        await run_in_threadpool(_create_user, user.username, hashed_password)
+    except IntegrityError:
+        # Lost a race with a concurrent signup for the same name
         raise HTTPException(status_code=400, detail="Username already registered")
-    
-    hashed_password = auth.get_password_hash(user.password)
-    new_user = models.User(username=user.username, hashed_password=hashed_password)
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    
-    access_token = auth.create_access_token(data={"sub": new_user.username})
+
+    access_token = auth.create_access_token(data={"sub": user.username})
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/token", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
-    user = db.query(models.User).filter(models.User.username == form_data.username).first()
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    # Throttle before touching bcrypt so brute force can't queue unbounded hashing work
+    ip = auth.client_ip(request)
+    auth.ip_throttle.check(ip)
+    auth.user_throttle.check(form_data.username)
+
+    user = await run_in_threadpool(_find_user, form_data.username)
+    valid, new_hash = await auth.verify_password_async(form_data.password, user.hashed_password) if user else (False, None)
+    if not valid:
+        auth.ip_throttle.fail(ip)
+        auth.user_throttle.fail(form_data.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+    auth.user_throttle.reset(form_data.username)
+
+    if new_hash:
+        # Stored hash used outdated parameters; upgrade it now that we know the password
+        await run_in_threadpool(_store_hash, user.id, new_hash)
+
     access_token = auth.create_access_token(data={"sub": user.username})
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": access_token, "token_type": "bearer"}
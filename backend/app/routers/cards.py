@@ -1,38 +1,59 @@
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from typing import List, Optional
 from datetime import datetime
-import shutil, os, uuid
-from .. import database, models, schemas, auth
+from .. import database, models, schemas, auth, summary, storage, billing, balances, responses, versions
 
 router = APIRouter()
-UPLOAD_DIR = "uploads"
 
 # ... (GET/POST/PUT/DELETE Cards) ...
-@router.get("/", response_model=List[schemas.CardOut])
-def get_cards(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
-    return db.query(models.Card).filter(models.Card.owner_id == current_user.id).all()
+@router.get("/", response_model=List[schemas.CardOut], dependencies=[Depends(versions.conditional("cards"))])
+def get_cards(response: Response, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_read_db)):
+    # Three column queries (cards, statements, payments) stitched into the nested CardOut shape, sent with orjson
+    Card, Stmt, Payment = models.Card, models.CardStatement, models.StatementPayment
+    cards = responses.rows(db.execute(select(*responses.columns(schemas.CardOut, Card)).where(Card.owner_id == current_user.id).order_by(Card.id)))
+    by_card = {card["id"]: card for card in cards}
+    for card in cards: card["statements"] = []
+    statements = responses.rows(db.execute(select(*responses.columns(schemas.StatementOut, Stmt, Stmt.card_id)).where(Stmt.card_id.in_(by_card)).order_by(Stmt.id))) if by_card else []
+    by_statement = {}
+    for stmt in statements:
+        stmt["payments"] = []
+        by_statement[stmt["id"]] = stmt
+        by_card[stmt.pop("card_id")]["statements"].append(stmt)
+    if by_statement:
+        for payment in responses.rows(db.execute(select(*responses.columns(schemas.StatementPaymentOut, Payment, Payment.statement_id)).where(Payment.statement_id.in_(by_statement)).order_by(Payment.id))):
+            by_statement[payment.pop("statement_id")]["payments"].append(payment)
+    return responses.json(cards, response)
+
+@router.get("/utilization", response_model=List[schemas.CardUtilization])
+def get_utilization(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_read_db)):
+    # Outstanding, available limit and utilization for every card of the user (see billing.py)
+    return billing.for_user(db, current_user.id)
 
 @router.post("/")
-async def create_card(name: str = Form(...), bank_name: str = Form(...), card_network: str = Form(...), card_type: str = Form(...), card_number: str = Form(...), cvv: str = Form(None), expiry_date: str = Form(...), owner_name: str = Form(...), limit: float = Form(...), statement_date: int = Form(None), payment_due_date: int = Form(None), color_theme: str = Form("gradient-1"), front_image: UploadFile = File(None), back_image: UploadFile = File(None), current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+async def create_card(name: str = Form(...), bank_name: str = Form(...), card_network: str = Form(...), card_type: str = Form(...), card_number: str = Form(...), cvv: str = Form(None), expiry_date: str = Form(...), owner_name: str = Form(...), limit: float = Form(...), statement_date: int = Form(None), payment_due_date: int = Form(None), color_theme: str = Form("gradient-1"), front_image: UploadFile = File(None), back_image: UploadFile = File(None), current_user: models.User = Depends(auth.get_current_user), db: AsyncSession = Depends(database.get_async_db)):
     last4 = card_number[-4:] if len(card_number) >= 4 else card_number
     front_path = None
     if front_image:
-        front_path = f"{uuid.uuid4()}.{front_image.filename.split('.')[-1]}"
-        with open(os.path.join(UPLOAD_DIR, front_path), "wb") as buffer: shutil.copyfileobj(front_image.file, buffer)
+        front_path = (await storage.save_upload(front_image, "image")).path
     back_path = None
     if back_image:
-        back_path = f"{uuid.uuid4()}.{back_image.filename.split('.')[-1]}"
-        with open(os.path.join(UPLOAD_DIR, back_path), "wb") as buffer: shutil.copyfileobj(back_image.file, buffer)
+        back_path = (await storage.save_upload(back_image, "image")).path
     new_card = models.Card(owner_id=current_user.id, name=name, bank_name=bank_name, card_network=card_network, card_type=card_type, card_number=card_number, card_number_last4=last4, cvv=cvv, expiry_date=expiry_date, owner_name=owner_name, limit=limit, statement_date=statement_date, payment_due_date=payment_due_date, color_theme=color_theme, front_image_path=front_path, back_image_path=back_path)
     db.add(new_card)
-    db.commit()
-    db.refresh(new_card)
+    await db.run_sync(summary.apply, current_user.id, card_count=1)
+    await db.run_sync(versions.bump, current_user.id, "cards")
+    await db.commit()
     return new_card
 
 @router.put("/{card_id}")
-async def update_card(card_id: int, name: str = Form(...), bank_name: str = Form(...), card_network: str = Form(...), card_type: str = Form(...), card_number: str = Form(...), cvv: str = Form(None), expiry_date: str = Form(...), owner_name: str = Form(...), limit: float = Form(...), statement_date: int = Form(None), payment_due_date: int = Form(None), color_theme: str = Form("gradient-1"), front_image: UploadFile = File(None), back_image: UploadFile = File(None), current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
-    card = db.query(models.Card).filter(models.Card.id == card_id, models.Card.owner_id == current_user.id).first()
+async def update_card(card_id: int, name: str = Form(...), bank_name: str = Form(...), card_network: str = Form(...), card_type: str = Form(...), card_number: str = Form(...), cvv: str = Form(None), expiry_date: str = Form(...), owner_name: str = Form(...), limit: float = Form(...), statement_date: int = Form(None), payment_due_date: int = Form(None), color_theme: str = Form("gradient-1"), front_image: UploadFile = File(None), back_image: UploadFile = File(None), current_user: models.User = Depends(auth.get_current_user), db: AsyncSession = Depends(database.get_async_db)):
+    # Files are stored before the first query so a slow upload never holds the writer connection
+    front_path = (await storage.save_upload(front_image, "image")).path if front_image else None
+    back_path = (await storage.save_upload(back_image, "image")).path if back_image else None
+    card = await db.scalar(select(models.Card).where(models.Card.id == card_id, models.Card.owner_id == current_user.id))
     if not card: raise HTTPException(status_code=404, detail="Card not found")
     card.name = name
     card.bank_name = bank_name
@@ -47,37 +68,42 @@ async def update_card(card_id: int, name: str = Form(...), bank_name: str = Form
     card.statement_date = statement_date
     card.payment_due_date = payment_due_date
     card.color_theme = color_theme
-    if front_image:
-        front_path = f"{uuid.uuid4()}.{front_image.filename.split('.')[-1]}"
-        with open(os.path.join(UPLOAD_DIR, front_path), "wb") as buffer: shutil.copyfileobj(front_image.file, buffer)
+    replaced = []
+    if front_path:
+        replaced.append(card.front_image_path)
         card.front_image_path = front_path
-    if back_image:
-        back_path = f"{uuid.uuid4()}.{back_image.filename.split('.')[-1]}"
-        with open(os.path.join(UPLOAD_DIR, back_path), "wb") as buffer: shutil.copyfileobj(back_image.file, buffer)
+    if back_path:
+        replaced.append(card.back_image_path)
         card.back_image_path = back_path
-    db.commit()
-    db.refresh(card)
+    await db.run_sync(versions.bump, current_user.id, "cards")
+    await db.commit()
+    billing.invalidate(card.id)
+    await db.run_sync(storage.release, *replaced)
     return card
 
 @router.delete("/{card_id}")
 def delete_card(card_id: int, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
     card = db.query(models.Card).filter(models.Card.id == card_id, models.Card.owner_id == current_user.id).first()
     if not card: raise HTTPException(status_code=404, detail="Card not found")
+    paths = storage.collect_paths(card)
     db.delete(card)
+    summary.apply(db, current_user.id, card_count=-1)
+    versions.bump(db, current_user.id, "cards")
     db.commit()
+    billing.invalidate(card_id)
+    storage.release(db, *paths)
     return {"message": "Card deleted"}
 
 @router.post("/{card_id}/statements")
-async def add_statement(card_id: int, month: str = Form(...), generated_date: str = Form(...), due_date: str = Form(...), total_due: float = Form(...), min_due: float = Form(0.0), attachment: UploadFile = File(None), current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
-    card = db.query(models.Card).filter(models.Card.id == card_id, models.Card.owner_id == current_user.id).first()
+async def add_statement(card_id: int, month: str = Form(...), generated_date: str = Form(...), due_date: str = Form(...), total_due: float = Form(...), min_due: float = Form(0.0), attachment: UploadFile = File(None), current_user: models.User = Depends(auth.get_current_user), db: AsyncSession = Depends(database.get_async_db)):
+    file_path = (await storage.save_upload(attachment, "document")).path if attachment else None
+    card = await db.scalar(select(models.Card).where(models.Card.id == card_id, models.Card.owner_id == current_user.id))
     if not card: raise HTTPException(status_code=404, detail="Card not found")
-    file_path = None
-    if attachment:
-        file_path = f"{uuid.uuid4()}.{attachment.filename.split('.')[-1]}"
-        with open(os.path.join(UPLOAD_DIR, file_path), "wb") as buffer: shutil.copyfileobj(attachment.file, buffer)
     stmt = models.CardStatement(card_id=card.id, month=month, generated_date=datetime.fromisoformat(generated_date), due_date=datetime.fromisoformat(due_date), total_due=total_due, min_due=min_due, attachment_path=file_path)
     db.add(stmt)
-    db.commit()
+    await db.run_sync(versions.bump, current_user.id, "cards")
+    await db.commit()
+    billing.invalidate(card.id)
     return {"message": "Statement added"}
 
 # --- Payment Logic ---
@@ -89,15 +115,11 @@ async def add_payment(
     date: str = Form(None),
     proof: UploadFile = File(None),
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
-    stmt = db.query(models.CardStatement).join(models.Card).filter(models.CardStatement.id == stmt_id, models.Card.owner_id == current_user.id).first()
+    proof_path = (await storage.save_upload(proof, "document")).path if proof else None
+    stmt = await db.scalar(select(models.CardStatement).join(models.Card).where(models.CardStatement.id == stmt_id, models.Card.owner_id == current_user.id))
     if not stmt: raise HTTPException(status_code=404, detail="Statement not found")
-    
-    proof_path = None
-    if proof:
-        proof_path = f"{uuid.uuid4()}.{proof.filename.split('.')[-1]}"
-        with open(os.path.join(UPLOAD_DIR, proof_path), "wb") as buffer: shutil.copyfileobj(proof.file, buffer)
 
     p_date = datetime.now()
     if date:
@@ -112,22 +134,36 @@ async def add_payment(
         proof_path=proof_path
     )
     db.add(payment)
-    
-    # Recalculate totals
-    total_paid = sum(p.amount for p in stmt.payments) + amount
-    stmt.paid_amount = total_paid
-    if stmt.paid_amount >= stmt.total_due:
-        stmt.is_paid = True
-    else:
-        stmt.is_paid = False
+    await db.run_sync(balances.add_payment, stmt.id, amount)
+    await db.run_sync(versions.bump, current_user.id, "cards")
+    await db.commit()
+    billing.invalidate(stmt.card_id)
+    return {"message": "Payment recorded"}
 
+@router.delete("/statements/{stmt_id}/payments/{payment_id}")
+def delete_payment(stmt_id: int, payment_id: int, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+    found = db.query(models.StatementPayment, models.CardStatement.card_id).join(models.CardStatement).join(models.Card).filter(
+        models.StatementPayment.id == payment_id, models.StatementPayment.statement_id == stmt_id, models.Card.owner_id == current_user.id).first()
+    if not found: raise HTTPException(status_code=404, detail="Payment not found")
+    payment, card_id = found
+    paths = storage.collect_paths(payment)
+    db.delete(payment)
+    balances.add_payment(db, stmt_id, -(payment.amount or 0.0))
+    versions.bump(db, current_user.id, "cards")
     db.commit()
-    return {"message": "Payment recorded"}
+    billing.invalidate(card_id)
+    storage.release(db, *paths)
+    return {"message": "Payment deleted"}
 
 @router.delete("/statements/{stmt_id}")
 def delete_statement(stmt_id: int, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
     stmt = db.query(models.CardStatement).join(models.Card).filter(models.CardStatement.id == stmt_id, models.Card.owner_id == current_user.id).first()
     if not stmt: raise HTTPException(status_code=404, detail="Statement not found")
+    paths = storage.collect_paths(stmt)
+    card_id = stmt.card_id
     db.delete(stmt)
+    versions.bump(db, current_user.id, "cards")
     db.commit()
+    billing.invalidate(card_id)
+    storage.release(db, *paths)
     return {"message": "Statement deleted"}
\ No newline at end of file
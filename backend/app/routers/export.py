@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from .. import models, auth, exporter
+
+router = APIRouter()
+
+@router.get("/")
+def export_account(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    entities: str = Query(None, description="Comma-separated subset of " + ", ".join(exporter.ENTITIES)),
+    zip: bool = Query(None, description="Defaults to true for CSV of several entities or when attachments are requested"),
+    attachments: bool = False,
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    selected = [e.strip() for e in entities.split(",") if e.strip()] if entities else exporter.ENTITIES
+    unknown = set(selected) - set(exporter.ENTITIES)
+    if unknown: raise HTTPException(status_code=400, detail=f"Unknown entities: {', '.join(sorted(unknown))}")
+    if zip is None: zip = attachments or (format == "csv" and len(selected) > 1)
+    if not zip and attachments: raise HTTPException(status_code=400, detail="Attachments are only exported inside a zip")
+    if not zip and format == "csv" and len(selected) > 1: raise HTTPException(status_code=400, detail="CSV of several entities needs zip=true")
+
+    # The generators open their own session: the request's dependencies are torn down before the body is sent
+    stamp = datetime.now().strftime("%Y%m%d")
+    if zip:
+        body, media_type, filename = exporter.stream_zip(current_user.id, selected, format, attachments), "application/zip", f"cc-track-{stamp}.zip"
+    elif format == "csv":
+        body, media_type, filename = exporter.stream_csv(current_user.id, selected[0]), "text/csv", f"cc-track-{selected[0]}-{stamp}.csv"
+    else:
+        body, media_type, filename = exporter.stream_ndjson(current_user.id, selected), "application/x-ndjson", f"cc-track-{stamp}.ndjson"
+    return StreamingResponse(body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
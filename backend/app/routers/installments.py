@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import date, datetime, time
+from .. import database, models, schemas, auth, emi
+
+router = APIRouter()
+
+@router.get("/", response_model=List[schemas.EmiInstallmentOut])
+def get_installments(
+    card_id: Optional[int] = None, start: Optional[date] = None, end: Optional[date] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_read_db)
+):
+    # EMI installments due between start and end (inclusive); defaults to the month ahead of today
+    start = start or date.today()
+    end = end or emi.add_months(datetime.combine(start, time.min), 1).date()
+    I, T = models.EmiInstallment, models.Transaction
+    q = db.query(I, T.description, T.emi_months, models.Card.name).join(T, T.id == I.transaction_id).outerjoin(models.Card, models.Card.id == I.card_id).filter(
+        I.owner_id == current_user.id, I.due_date >= datetime.combine(start, time.min), I.due_date <= datetime.combine(end, time.max)
+    )
+    if card_id is not None: q = q.filter(I.card_id == card_id)
+    return [
+        {**{c.key: getattr(i, c.key) for c in I.__table__.c if c.key != "owner_id"}, "months": months, "description": description, "card_name": card_name}
+        for i, description, months, card_name in q.order_by(I.due_date, I.id).limit(limit)
+    ]
@@ -1,26 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
 from typing import List
-import shutil, os, uuid
 from datetime import datetime
-from .. import database, models, schemas, auth
+from .. import database, models, schemas, auth, summary, storage, balances, responses, versions
 
 router = APIRouter()
-UPLOAD_DIR = "uploads"
 
-@router.get("/", response_model=List[schemas.LendingOut])
-def get_lendings(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
-    lendings = db.query(models.Lending).filter(models.Lending.owner_id == current_user.id).order_by(models.Lending.lent_date.desc()).all()
-    results = []
-    for l in lendings:
-        returned = sum(r.amount for r in l.returns)
-        pending = l.total_amount - returned
-        l_dict = l.__dict__.copy()
-        l_dict['returned_amount'] = returned
-        l_dict['pending_amount'] = pending
-        l_dict['returns'] = l.returns
-        results.append(l_dict)
-    return results
+@router.get("/", response_model=List[schemas.LendingOut], dependencies=[Depends(versions.conditional("lending"))])
+def get_lendings(response: Response, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_read_db)):
+    # Totals are the stored returned_amount and the returns come from a second column query; plain dicts go out through orjson
+    Lending, Return = models.Lending, models.LendingReturn
+    results = responses.rows(
+        db.query(*responses.columns(schemas.LendingOut, Lending), (Lending.total_amount - func.coalesce(Lending.returned_amount, 0.0)).label("pending_amount"))
+        .filter(Lending.owner_id == current_user.id)
+        .order_by(Lending.lent_date.desc())
+    )
+    by_id = {l["id"]: l for l in results}
+    for l in results: l["returns"] = []
+    if by_id:
+        for r in responses.rows(db.query(*responses.columns(schemas.LendingReturnOut, Return, Return.lending_id)).filter(Return.lending_id.in_(by_id)).order_by(Return.id)):
+            by_id[r.pop("lending_id")]["returns"].append(r)
+    return responses.json(results, response)
 
 @router.post("/")
 async def create_lending(
@@ -29,13 +31,16 @@ async def create_lending(
     lent_date: str = Form(None),
     proof: UploadFile = File(None),
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     date_val = datetime.now()
     if lent_date:
         try: date_val = datetime.fromisoformat(lent_date.replace('Z', '+00:00'))
         except: pass
 
+    # Store the proof before writing anything so a rejected upload leaves no half-created lending
+    file_path = (await storage.save_upload(proof, "document")).path if proof else None
+
     new_lending = models.Lending(
         person_name=person_name,
         total_amount=total_amount,
@@ -43,18 +48,19 @@ async def create_lending(
         lent_date=date_val
     )
     db.add(new_lending)
-    db.commit()
-    db.refresh(new_lending)
+    await db.flush()
+    await db.run_sync(lambda s: summary.apply_lending(s, current_user.id, (0, 0.0), summary.lending_state(s, new_lending)))
+    await db.run_sync(versions.bump, current_user.id, "lending")
+    await db.commit()
     
-    if proof:
-        file_path = f"{uuid.uuid4()}.{proof.filename.split('.')[-1]}"
-        with open(os.path.join(UPLOAD_DIR, file_path), "wb") as buffer: shutil.copyfileobj(proof.file, buffer)
+    if file_path:
         proof_entry = models.LendingReturn(lending_id=new_lending.id, amount=0, proof_image_path=file_path, return_date=date_val)
         db.add(proof_entry)
-        db.commit()
+        await db.run_sync(versions.bump, current_user.id, "lending")
+        await db.commit()
 
     l_dict = new_lending.__dict__.copy()
-    l_dict['returned_amount'] = 0.0
+    l_dict['returned_amount'] = new_lending.returned_amount
     l_dict['pending_amount'] = new_lending.total_amount
     return l_dict
 
@@ -66,25 +72,28 @@ async def update_lending(
     lent_date: str = Form(None),
     proof: UploadFile = File(None),
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
-    lending = db.query(models.Lending).filter(models.Lending.id == lending_id, models.Lending.owner_id == current_user.id).first()
+    file_path = (await storage.save_upload(proof, "document")).path if proof else None
+    lending = await db.scalar(select(models.Lending).where(models.Lending.id == lending_id, models.Lending.owner_id == current_user.id))
     if not lending: raise HTTPException(status_code=404, detail="Not found")
+    before = await db.run_sync(summary.lending_state, lending)
     
     lending.person_name = person_name
     lending.total_amount = total_amount
+    lending.is_settled = (lending.returned_amount or 0.0) >= total_amount
     if lent_date:
         try: lending.lent_date = datetime.fromisoformat(lent_date.replace('Z', '+00:00'))
         except: pass
     
-    if proof:
-        file_path = f"{uuid.uuid4()}.{proof.filename.split('.')[-1]}"
-        with open(os.path.join(UPLOAD_DIR, file_path), "wb") as buffer: shutil.copyfileobj(proof.file, buffer)
+    if file_path:
         proof_entry = models.LendingReturn(lending_id=lending.id, amount=0, proof_image_path=file_path, return_date=datetime.now())
         db.add(proof_entry)
 
-    db.commit()
-    db.refresh(lending)
+    await db.flush()
+    await db.run_sync(lambda s: summary.apply_lending(s, current_user.id, before, summary.lending_state(s, lending)))
+    await db.run_sync(versions.bump, current_user.id, "lending")
+    await db.commit()
     return {"message": "Updated"}
 
 @router.post("/{lending_id}/return")
@@ -94,38 +103,49 @@ async def add_return(
     return_date: str = Form(None),
     file: UploadFile = File(None),
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
-    lending = db.query(models.Lending).filter(models.Lending.id == lending_id, models.Lending.owner_id == current_user.id).first()
+    filename = (await storage.save_upload(file, "document")).path if file else None
+    lending = await db.scalar(select(models.Lending).where(models.Lending.id == lending_id, models.Lending.owner_id == current_user.id))
     if not lending: raise HTTPException(status_code=404, detail="Lending not found")
+    before = await db.run_sync(summary.lending_state, lending)
     
     r_date = datetime.now()
     if return_date:
         try: r_date = datetime.fromisoformat(return_date.replace('Z', '+00:00'))
         except: pass
 
-    filename = None
-    if file:
-        file_ext = file.filename.split(".")[-1]
-        filename = f"{uuid.uuid4()}.{file_ext}"
-        with open(os.path.join(UPLOAD_DIR, filename), "wb") as buffer: shutil.copyfileobj(file.file, buffer)
-        
     new_return = models.LendingReturn(lending_id=lending.id, amount=amount, proof_image_path=filename, return_date=r_date)
     db.add(new_return)
-    
-    current_returned = sum(r.amount for r in lending.returns) + amount
-    if current_returned >= lending.total_amount:
-        lending.is_settled = True
-    else:
-        lending.is_settled = False
-        
-    db.commit()
+    await db.run_sync(balances.add_return, lending.id, amount)
+    await db.run_sync(lambda s: summary.apply_lending(s, current_user.id, before, summary.lending_state(s, lending)))
+    await db.run_sync(versions.bump, current_user.id, "lending")
+    await db.commit()
     return {"message": "Return added"}
 
+@router.delete("/{lending_id}/return/{return_id}")
+def delete_return(lending_id: int, return_id: int, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+    lending = db.query(models.Lending).filter(models.Lending.id == lending_id, models.Lending.owner_id == current_user.id).first()
+    entry = db.query(models.LendingReturn).filter(models.LendingReturn.id == return_id, models.LendingReturn.lending_id == lending_id).first() if lending else None
+    if not entry: raise HTTPException(status_code=404, detail="Return not found")
+    before = summary.lending_state(db, lending)
+    paths = storage.collect_paths(entry)
+    db.delete(entry)
+    balances.add_return(db, lending.id, -(entry.amount or 0.0))
+    summary.apply_lending(db, current_user.id, before, summary.lending_state(db, lending))
+    versions.bump(db, current_user.id, "lending")
+    db.commit()
+    storage.release(db, *paths)
+    return {"message": "Return deleted"}
+
 @router.delete("/{lending_id}")
 def delete_lending(lending_id: int, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
     lending = db.query(models.Lending).filter(models.Lending.id == lending_id, models.Lending.owner_id == current_user.id).first()
     if not lending: raise HTTPException(status_code=404, detail="Not found")
+    summary.apply_lending(db, current_user.id, summary.lending_state(db, lending), (0, 0.0))
+    paths = storage.collect_paths(lending)
     db.delete(lending)
+    versions.bump(db, current_user.id, "lending")
     db.commit()
+    storage.release(db, *paths)
     return {"message": "Deleted"}
\ No newline at end of file
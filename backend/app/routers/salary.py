@@ -1,20 +1,26 @@
 from fastapi import APIRouter, Depends, File, UploadFile, Form, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
 from typing import List
 from datetime import datetime
-import shutil, os, uuid
-from .. import database, models, schemas, auth
+from .. import database, models, schemas, auth, summary, rollups, storage, versions
 
 router = APIRouter()
-UPLOAD_DIR = "uploads"
 
 # --- Company Management ---
-@router.get("/companies", response_model=List[schemas.CompanyOut])
-def get_companies(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
-    comps = db.query(models.Company).filter(models.Company.owner_id == current_user.id).order_by(models.Company.joining_date.desc()).all()
+@router.get("/companies", response_model=List[schemas.CompanyOut], dependencies=[Depends(versions.conditional("salary"))])
+def get_companies(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_read_db)):
+    rows = (
+        db.query(models.Company, func.coalesce(func.sum(models.Salary.amount), 0.0))
+        .outerjoin(models.Company.salaries)
+        .filter(models.Company.owner_id == current_user.id)
+        .group_by(models.Company.id)
+        .order_by(models.Company.joining_date.desc())
+        .all()
+    )
     results = []
-    for c in comps:
-        total = sum(s.amount for s in c.salaries)
+    for c, total in rows:
         c_dict = c.__dict__.copy()
         c_dict['total_earned'] = total
         results.append(c_dict)
@@ -24,12 +30,11 @@ def get_companies(current_user: models.User = Depends(auth.get_current_user), db
 async def add_company(
     name: str = Form(...), joining_date: str = Form(...), relieving_date: str = Form(None),
     is_current: bool = Form(False), logo: UploadFile = File(None),
-    current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)
+    current_user: models.User = Depends(auth.get_current_user), db: AsyncSession = Depends(database.get_async_db)
 ):
     logo_path = None
     if logo:
-        logo_path = f"{uuid.uuid4()}.{logo.filename.split('.')[-1]}"
-        with open(os.path.join(UPLOAD_DIR, logo_path), "wb") as buffer: shutil.copyfileobj(logo.file, buffer)
+        logo_path = (await storage.save_upload(logo, "image")).path
     j_date = datetime.fromisoformat(joining_date)
     r_date = datetime.fromisoformat(relieving_date) if relieving_date else None
     new_comp = models.Company(
@@ -37,8 +42,8 @@ async def add_company(
         is_current=is_current, logo_path=logo_path
     )
     db.add(new_comp)
-    db.commit()
-    db.refresh(new_comp)
+    await db.run_sync(versions.bump, current_user.id, "salary")
+    await db.commit()
     c_dict = new_comp.__dict__.copy()
     c_dict['total_earned'] = 0.0
     return c_dict
@@ -48,9 +53,10 @@ async def update_company(
     company_id: int,
     name: str = Form(...), joining_date: str = Form(...), relieving_date: str = Form(None),
     is_current: bool = Form(False), logo: UploadFile = File(None),
-    current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)
+    current_user: models.User = Depends(auth.get_current_user), db: AsyncSession = Depends(database.get_async_db)
 ):
-    comp = db.query(models.Company).filter(models.Company.id == company_id, models.Company.owner_id == current_user.id).first()
+    logo_path = (await storage.save_upload(logo, "image")).path if logo else None
+    comp = await db.scalar(select(models.Company).where(models.Company.id == company_id, models.Company.owner_id == current_user.id))
     if not comp: raise HTTPException(status_code=404, detail="Not found")
 
     comp.name = name
@@ -58,14 +64,15 @@ async def update_company(
     comp.relieving_date = datetime.fromisoformat(relieving_date) if relieving_date else None
     comp.is_current = is_current
 
-    if logo:
-        logo_path = f"{uuid.uuid4()}.{logo.filename.split('.')[-1]}"
-        with open(os.path.join(UPLOAD_DIR, logo_path), "wb") as buffer: shutil.copyfileobj(logo.file, buffer)
+    replaced = []
+    if logo_path:
+        replaced.append(comp.logo_path)
         comp.logo_path = logo_path
     
-    db.commit()
-    db.refresh(comp)
-    total = sum(s.amount for s in comp.salaries)
+    await db.run_sync(versions.bump, current_user.id, "salary")
+    await db.commit()
+    await db.run_sync(storage.release, *replaced)
+    total = await db.scalar(select(func.coalesce(func.sum(models.Salary.amount), 0.0)).where(models.Salary.company_id == comp.id))
     c_dict = comp.__dict__.copy()
     c_dict['total_earned'] = total
     return c_dict
@@ -74,13 +81,18 @@ async def update_company(
 def delete_company(company_id: int, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
     comp = db.query(models.Company).filter(models.Company.id == company_id, models.Company.owner_id == current_user.id).first()
     if not comp: raise HTTPException(status_code=404, detail="Not found")
+    paths = storage.collect_paths(comp)
+    rollups.apply_salaries(db, current_user.id, before=[rollups.salary_state(s) for s in comp.salaries])
     db.delete(comp)
+    summary.refresh_last_salary(db, current_user.id)
+    versions.bump(db, current_user.id, "salary")
     db.commit()
+    storage.release(db, *paths)
     return {"message": "Deleted"}
 
 # --- Salary Management ---
-@router.get("/slips/{company_id}", response_model=List[schemas.SalaryOut])
-def get_salaries(company_id: int, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+@router.get("/slips/{company_id}", response_model=List[schemas.SalaryOut], dependencies=[Depends(versions.conditional("salary"))])
+def get_salaries(company_id: int, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_read_db)):
     comp = db.query(models.Company).filter(models.Company.id == company_id, models.Company.owner_id == current_user.id).first()
     if not comp: raise HTTPException(status_code=404, detail="Company not found")
     return db.query(models.Salary).filter(models.Salary.company_id == company_id).order_by(models.Salary.date_added.desc()).all()
@@ -88,26 +100,29 @@ def get_salaries(company_id: int, current_user: models.User = Depends(auth.get_c
 @router.post("/slips")
 async def add_salary(
     company_id: int = Form(...), amount: float = Form(...), month: str = Form(...), year: int = Form(...),
-    slip: UploadFile = File(None), current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)
+    slip: UploadFile = File(None), current_user: models.User = Depends(auth.get_current_user), db: AsyncSession = Depends(database.get_async_db)
 ):
-    comp = db.query(models.Company).filter(models.Company.id == company_id, models.Company.owner_id == current_user.id).first()
+    file_path = (await storage.save_upload(slip, "document")).path if slip else None
+    comp = await db.scalar(select(models.Company).where(models.Company.id == company_id, models.Company.owner_id == current_user.id))
     if not comp: raise HTTPException(status_code=404, detail="Company not found")
 
-    file_path = None
-    if slip:
-        file_path = f"{uuid.uuid4()}.{slip.filename.split('.')[-1]}"
-        with open(os.path.join(UPLOAD_DIR, file_path), "wb") as buffer: shutil.copyfileobj(slip.file, buffer)
-
     new_salary = models.Salary(owner_id=current_user.id, company_id=company_id, amount=amount, month=month, year=year, attachment_path=file_path)
     db.add(new_salary)
-    db.commit()
-    db.refresh(new_salary)
+    await db.run_sync(summary.refresh_last_salary, current_user.id)
+    await db.run_sync(rollups.apply_salaries, current_user.id, after=[rollups.salary_state(new_salary)])
+    await db.run_sync(versions.bump, current_user.id, "salary")
+    await db.commit()
     return new_salary
 
 @router.delete("/slips/{slip_id}")
 def delete_slip(slip_id: int, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
     slip = db.query(models.Salary).filter(models.Salary.id == slip_id, models.Salary.owner_id == current_user.id).first()
     if not slip: raise HTTPException(status_code=404, detail="Slip not found")
+    paths = storage.collect_paths(slip)
     db.delete(slip)
+    summary.refresh_last_salary(db, current_user.id)
+    rollups.apply_salaries(db, current_user.id, before=[rollups.salary_state(slip)])
+    versions.bump(db, current_user.id, "salary")
     db.commit()
+    storage.release(db, *paths)
     return {"message": "Deleted"}
\ No newline at end of file
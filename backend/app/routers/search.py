@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import date, datetime, time, timedelta
+from .. import database, models, schemas, auth, search
+
+router = APIRouter()
+
+KINDS = ("transactions", "lending", "subscriptions")
+
+@router.get("/", response_model=schemas.SearchResults)
+def search_all(
+    q: str = Query(..., min_length=1, max_length=200),
+    kinds: str = Query(",".join(KINDS), description="Comma-separated subset of transactions, lending, subscriptions"),
+    date_from: Optional[date] = None, date_to: Optional[date] = None,
+    min_amount: Optional[float] = None, max_amount: Optional[float] = None,
+    card_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_read_db)
+):
+    # Ranked prefix search; the date and amount filters apply to each kind's own date/amount column,
+    # and card_id limits the search to transactions on that card
+    query = search.match_query(q)
+    if not query: raise HTTPException(status_code=400, detail="Search needs at least one word")
+    wanted = {k.strip() for k in kinds.split(",") if k.strip()}
+    if not wanted or wanted - set(KINDS): raise HTTPException(status_code=400, detail=f"kinds must be a subset of {', '.join(KINDS)}")
+    if card_id is not None: wanted &= {"transactions"}
+    start = datetime.combine(date_from, time.min) if date_from else None
+    end = datetime.combine(date_to + timedelta(days=1), time.min) if date_to else None
+
+    def ranked(base, model, q, date_column, amount_column):
+        index, onclause, match, rank = search.matching(base, model, query)
+        q = q.join(index, onclause).filter(match, model.owner_id == current_user.id)
+        if start: q = q.filter(date_column >= start)
+        if end: q = q.filter(date_column < end)
+        if min_amount is not None: q = q.filter(amount_column >= min_amount)
+        if max_amount is not None: q = q.filter(amount_column <= max_amount)
+        return q.order_by(rank).limit(limit)
+
+    results = {kind: [] for kind in KINDS}
+    T, L, S = models.Transaction, models.Lending, models.Subscription
+    if "transactions" in wanted:
+        tq = db.query(T).filter(T.card_id == card_id) if card_id is not None else db.query(T)
+        results["transactions"] = ranked("transactions", T, tq, T.date, T.amount).all()
+    if "lending" in wanted:
+        results["lending"] = [
+            {"id": l.id, "person_name": l.person_name, "total_amount": l.total_amount, "lent_date": l.lent_date, "is_settled": l.is_settled, "pending_amount": l.total_amount - (l.returned_amount or 0.0)}
+            for l in ranked("lending", L, db.query(L), L.lent_date, L.total_amount)
+        ]
+    if "subscriptions" in wanted:
+        results["subscriptions"] = ranked("subscriptions", S, db.query(S), S.renewal_date, S.amount).all()
+    return results
@@ -1,8 +1,7 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from typing import List
-import requests
-from .. import database, models, schemas, auth
+from .. import database, models, schemas, auth, reminders
 
 router = APIRouter()
 
@@ -17,24 +16,29 @@ def update_settings(
     current_user: models.User = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
-    current_user.currency = settings.currency
-    current_user.ntfy_url = settings.ntfy_url
-    current_user.ntfy_topic = settings.ntfy_topic
+    # current_user is a cached snapshot, so load the row to modify it
+    user = db.query(models.User).filter(models.User.id == current_user.id).first()
+    user.currency = settings.currency
+    user.ntfy_url = settings.ntfy_url
+    user.ntfy_topic = settings.ntfy_topic
     db.commit()
-    db.refresh(current_user)
-    return current_user
+    db.refresh(user)
+    auth.invalidate_user(user.username)  # this worker only; the others catch up within auth_user_cache_ttl
+    return user
+
+@router.get("/cache-stats")
+def get_cache_stats(current_user: models.User = Depends(auth.get_current_user)):
+    return auth.cache_stats()
 
 @router.post("/test-ntfy")
-def test_notification(current_user: models.User = Depends(auth.get_current_user)):
+async def test_notification(current_user: models.User = Depends(auth.get_current_user)):
     if not current_user.ntfy_url or not current_user.ntfy_topic:
         return {"message": "Ntfy not configured"}
     
     try:
-        resp = requests.post(
-            f"{current_user.ntfy_url}/{current_user.ntfy_topic}",
-            data="Test notification from CC-Track".encode('utf-8'),
-            headers={"Title": "CC-Track Test".encode('utf-8')}
-        )
+        # Shared pooled client (see reminders.py), awaited so the worker isn't blocked; a single attempt,
+        # so a broken ntfy setup is reported right away instead of after the background job's backoff
+        resp = await reminders.send(current_user.ntfy_url, current_user.ntfy_topic, "Test notification from CC-Track", title="CC-Track Test", retries=0)
         return {"message": f"Sent, status: {resp.status_code}"}
     except Exception as e:
         return {"message": f"Failed: {str(e)}"}
\ No newline at end of file
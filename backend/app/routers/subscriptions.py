@@ -1,22 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, Form, File, UploadFile
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from typing import List
 from datetime import datetime
-import shutil, os, uuid
-from .. import database, models, schemas, auth
+from .. import database, models, schemas, auth, summary, storage, versions
 
 router = APIRouter()
-UPLOAD_DIR = "uploads"
 
-@router.get("/", response_model=List[schemas.SubscriptionOut])
-def get_subs(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+@router.get("/", response_model=List[schemas.SubscriptionOut], dependencies=[Depends(versions.conditional("subscriptions"))])
+def get_subs(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_read_db)):
     return db.query(models.Subscription).filter(models.Subscription.owner_id == current_user.id).all()
 
 @router.post("/", response_model=schemas.SubscriptionOut)
 async def create_sub(
     name: str = Form(...), amount: float = Form(...), frequency: str = Form("Monthly"), 
     renewal_date: str = Form(None), logo: UploadFile = File(None),
-    current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)
+    current_user: models.User = Depends(auth.get_current_user), db: AsyncSession = Depends(database.get_async_db)
 ):
     r_date = None
     if renewal_date:
@@ -25,27 +25,29 @@ async def create_sub(
     
     logo_path = None
     if logo:
-        logo_path = f"{uuid.uuid4()}.{logo.filename.split('.')[-1]}"
-        with open(os.path.join(UPLOAD_DIR, logo_path), "wb") as buffer: shutil.copyfileobj(logo.file, buffer)
+        logo_path = (await storage.save_upload(logo, "image")).path
 
     new_sub = models.Subscription(
         owner_id=current_user.id, name=name, amount=amount, frequency=frequency, 
         renewal_date=r_date, logo_path=logo_path
     )
     db.add(new_sub)
-    db.commit()
-    db.refresh(new_sub)
+    await db.run_sync(summary.apply, current_user.id, monthly_subs=amount)
+    await db.run_sync(versions.bump, current_user.id, "subscriptions")
+    await db.commit()
     return new_sub
 
 @router.put("/{sub_id}", response_model=schemas.SubscriptionOut)
 async def update_sub(
     sub_id: int, name: str = Form(...), amount: float = Form(...), frequency: str = Form(...),
     renewal_date: str = Form(None), logo: UploadFile = File(None),
-    current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)
+    current_user: models.User = Depends(auth.get_current_user), db: AsyncSession = Depends(database.get_async_db)
 ):
-    sub = db.query(models.Subscription).filter(models.Subscription.id == sub_id, models.Subscription.owner_id == current_user.id).first()
+    logo_path = (await storage.save_upload(logo, "image")).path if logo else None
+    sub = await db.scalar(select(models.Subscription).where(models.Subscription.id == sub_id, models.Subscription.owner_id == current_user.id))
     if not sub: raise HTTPException(status_code=404, detail="Not found")
     
+    if sub.active: await db.run_sync(summary.apply, current_user.id, monthly_subs=amount - sub.amount)
     sub.name = name
     sub.amount = amount
     sub.frequency = frequency
@@ -53,19 +55,24 @@ async def update_sub(
         try: sub.renewal_date = datetime.fromisoformat(renewal_date)
         except: pass
     
-    if logo:
-        logo_path = f"{uuid.uuid4()}.{logo.filename.split('.')[-1]}"
-        with open(os.path.join(UPLOAD_DIR, logo_path), "wb") as buffer: shutil.copyfileobj(logo.file, buffer)
+    replaced = []
+    if logo_path:
+        replaced.append(sub.logo_path)
         sub.logo_path = logo_path
     
-    db.commit()
-    db.refresh(sub)
+    await db.run_sync(versions.bump, current_user.id, "subscriptions")
+    await db.commit()
+    await db.run_sync(storage.release, *replaced)
     return sub
 
 @router.delete("/{sub_id}")
 def delete_sub(sub_id: int, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
     sub = db.query(models.Subscription).filter(models.Subscription.id == sub_id, models.Subscription.owner_id == current_user.id).first()
     if sub:
+        if sub.active: summary.apply(db, current_user.id, monthly_subs=-sub.amount)
+        paths = storage.collect_paths(sub)
         db.delete(sub)
+        versions.bump(db, current_user.id, "subscriptions")
         db.commit()
+        storage.release(db, *paths)
     return {"message": "Deleted"}
\ No newline at end of file
@@ -1,19 +1,66 @@
-from fastapi import APIRouter, Depends, File, UploadFile, Form, HTTPException
+from fastapi import APIRouter, Depends, File, UploadFile, Form, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime
-import shutil, os, uuid
-from .. import database, models, schemas, auth
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, select
+from typing import List, Optional, Union
+from datetime import datetime, date, time, timedelta
+import base64, io
+from .. import database, models, schemas, auth, summary, rollups, billing, emi, storage, importers, responses, versions
+from ..config import settings
 
 router = APIRouter()
-UPLOAD_DIR = "uploads"
 
-@router.get("/", response_model=List[schemas.TransactionOut])
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def _encode_cursor(tx):
+    return base64.urlsafe_b64encode(f"{(tx.date or models.UNDATED).isoformat()}|{tx.id}".encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        raw_date, raw_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(raw_date), int(raw_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/", response_model=Union[schemas.TransactionPage, List[schemas.TransactionOut]], dependencies=[Depends(versions.conditional("transactions"))])
 def get_transactions(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    card_id: Optional[int] = None, type: Optional[str] = None, payment_mode: Optional[str] = None, is_emi: Optional[bool] = None,
+    date_from: Optional[date] = None, date_to: Optional[date] = None,
+    min_amount: Optional[float] = None, max_amount: Optional[float] = None,
+    fetch_all: bool = Query(False, alias="all"),
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: Session = Depends(database.get_read_db)
 ):
-    return db.query(models.Transaction).filter(models.Transaction.owner_id == current_user.id).order_by(models.Transaction.date.desc()).all()
+    # Column projection + orjson (see responses.py): no ORM objects or per-row validation on pages of thousands
+    q = db.query(*responses.columns(schemas.TransactionOut, models.Transaction)).filter(models.Transaction.owner_id == current_user.id)
+    if card_id is not None: q = q.filter(models.Transaction.card_id == card_id)
+    if type is not None: q = q.filter(models.Transaction.type == type)
+    if payment_mode is not None: q = q.filter(models.Transaction.payment_mode == payment_mode)
+    if is_emi is not None: q = q.filter(models.Transaction.is_emi == is_emi)
+    if date_from is not None: q = q.filter(models.Transaction.date >= datetime.combine(date_from, time.min))
+    if date_to is not None: q = q.filter(models.Transaction.date < datetime.combine(date_to + timedelta(days=1), time.min))
+    if min_amount is not None: q = q.filter(models.Transaction.amount >= min_amount)
+    if max_amount is not None: q = q.filter(models.Transaction.amount <= max_amount)
+    # Same order as ix_transactions_owner_sort_date_id so every page is an index range scan; undated rows come last
+    sort_date = models.sort_date(models.Transaction.date)
+    q = q.order_by(sort_date.desc(), models.Transaction.id)
+
+    # Legacy clients get the whole (filtered) history as a bare list
+    if fetch_all:
+        return responses.json(responses.rows(q), response)
+
+    if cursor:
+        c_date, c_id = _decode_cursor(cursor)
+        q = q.filter(or_(sort_date < c_date, and_(sort_date == c_date, models.Transaction.id > c_id)))
+
+    rows = q.limit(limit + 1).all()
+    items = rows[:limit]
+    next_cursor = _encode_cursor(items[-1]) if len(rows) > limit else None
+    return responses.json({"items": responses.rows(items), "next_cursor": next_cursor}, response)
 
 @router.post("/")
 async def create_transaction(
@@ -21,12 +68,11 @@ async def create_transaction(
     card_id: int = Form(None), merchant_location: str = Form(None),
     payment_mode: str = Form("online"), is_emi: bool = Form(False), emi_months: int = Form(None),
     date_str: str = Form(None), attachment: UploadFile = File(None),
-    current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)
+    current_user: models.User = Depends(auth.get_current_user), db: AsyncSession = Depends(database.get_async_db)
 ):
     file_path = None
     if attachment:
-        file_path = f"{uuid.uuid4()}.{attachment.filename.split('.')[-1]}"
-        with open(os.path.join(UPLOAD_DIR, file_path), "wb") as buffer: shutil.copyfileobj(attachment.file, buffer)
+        file_path = (await storage.save_upload(attachment, "document")).path
 
     tx_date = datetime.now()
     if date_str:
@@ -39,10 +85,36 @@ async def create_transaction(
         is_emi=is_emi, emi_months=emi_months, date=tx_date, attachment_path=file_path
     )
     db.add(new_tx)
-    db.commit()
-    db.refresh(new_tx)
+    if is_emi:
+        await db.flush()
+        await db.run_sync(emi.sync, new_tx)
+    await db.run_sync(summary.apply, current_user.id, transaction_count=1)
+    await db.run_sync(rollups.apply_transactions, current_user.id, after=[rollups.tx_state(new_tx)])
+    await db.run_sync(versions.bump, current_user.id, "transactions")
+    await db.commit()
+    billing.invalidate(card_id)
     return new_tx
 
+@router.post("/import", response_model=schemas.ImportResult)
+def import_transactions(
+    file: UploadFile = File(...), card_id: int = Form(None), payment_mode: str = Form("online"),
+    date_format: str = Form(None), positive_is_expense: bool = Form(False), dry_run: bool = Form(False),
+    current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_read_db)
+):
+    # CSV / delimited / OFX / QFX statement -> transactions, parsed as a stream and inserted in batches.
+    # card_id applies to rows without a card column; positive_is_expense is for card exports where spends are positive.
+    if file.size is not None and file.size > settings.max_import_size:
+        raise HTTPException(status_code=413, detail=f"{file.filename} exceeds {settings.max_import_size // (1024 * 1024)} MB")
+    if card_id is not None and not db.query(models.Card.id).filter(models.Card.id == card_id, models.Card.owner_id == current_user.id).first():
+        raise HTTPException(status_code=404, detail="Card not found")
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        return importers.import_statement(db, current_user.id, stream, card_id=card_id, payment_mode=payment_mode, positive_is_expense=positive_is_expense, date_format=date_format, dry_run=dry_run, write_session=database.SessionLocal)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        stream.detach()
+
 @router.put("/{tx_id}")
 async def update_transaction(
     tx_id: int,
@@ -50,10 +122,13 @@ async def update_transaction(
     card_id: int = Form(None), merchant_location: str = Form(None),
     payment_mode: str = Form("online"), is_emi: bool = Form(False), emi_months: int = Form(None),
     date_str: str = Form(None), attachment: UploadFile = File(None),
-    current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)
+    current_user: models.User = Depends(auth.get_current_user), db: AsyncSession = Depends(database.get_async_db)
 ):
-    tx = db.query(models.Transaction).filter(models.Transaction.id == tx_id, models.Transaction.owner_id == current_user.id).first()
+    file_path = (await storage.save_upload(attachment, "document")).path if attachment else None
+    tx = await db.scalar(select(models.Transaction).where(models.Transaction.id == tx_id, models.Transaction.owner_id == current_user.id))
     if not tx: raise HTTPException(status_code=404, detail="Not found")
+    before = rollups.tx_state(tx)
+    old_card_id = tx.card_id
 
     tx.description = description
     tx.amount = amount
@@ -68,19 +143,30 @@ async def update_transaction(
         try: tx.date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
         except: pass
 
-    if attachment:
-        file_path = f"{uuid.uuid4()}.{attachment.filename.split('.')[-1]}"
-        with open(os.path.join(UPLOAD_DIR, file_path), "wb") as buffer: shutil.copyfileobj(attachment.file, buffer)
+    replaced = []
+    if file_path:
+        replaced.append(tx.attachment_path)
         tx.attachment_path = file_path
 
-    db.commit()
-    db.refresh(tx)
+    await db.run_sync(emi.sync, tx)
+    await db.run_sync(rollups.apply_transactions, current_user.id, before=[before], after=[rollups.tx_state(tx)])
+    await db.run_sync(versions.bump, current_user.id, "transactions")
+    await db.commit()
+    billing.invalidate(old_card_id, card_id)
+    await db.run_sync(storage.release, *replaced)
     return tx
 
 @router.delete("/{tx_id}")
 def delete_transaction(tx_id: int, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
     tx = db.query(models.Transaction).filter(models.Transaction.id == tx_id, models.Transaction.owner_id == current_user.id).first()
     if not tx: raise HTTPException(status_code=404, detail="Not found")
+    paths = storage.collect_paths(tx)
     db.delete(tx)
+    emi.remove(db, tx.id)
+    summary.apply(db, current_user.id, transaction_count=-1)
+    rollups.apply_transactions(db, current_user.id, before=[rollups.tx_state(tx)])
+    versions.bump(db, current_user.id, "transactions")
     db.commit()
+    billing.invalidate(tx.card_id)
+    storage.release(db, *paths)
     return {"message": "Deleted"}
\ No newline at end of file
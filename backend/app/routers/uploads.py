@@ -0,0 +1,77 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response, StreamingResponse
+import os, re
+from .. import storage
+
+router = APIRouter()
+
+CHUNK_SIZE = 64 * 1024
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def _validators(name: str, path: str, size_name: str = None):
+    # Content-addressed names never change, so the digest is a strong ETag and caches may keep them forever.
+    # Legacy uuid names fall back to mtime/size and must be revalidated.
+    stat = os.stat(path)
+    if storage.CONTENT_NAME.match(name):
+        stem = os.path.splitext(name)[0]
+        etag = f'"{stem}-{size_name}"' if size_name else f'"{stem}"'
+        cache_control = "private, max-age=31536000, immutable"
+    else:
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        cache_control = "private, no-cache"
+    return stat, {"ETag": etag, "Cache-Control": cache_control, "Accept-Ranges": "bytes"}
+
+def _byte_range(header: str, file_size: int):
+    # Single "bytes=" ranges only; anything else is served in full as RFC 9110 allows
+    match = RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    start, end = match.groups()
+    if start == "":
+        start, end = max(file_size - int(end), 0), file_size - 1
+    else:
+        start, end = int(start), min(int(end), file_size - 1) if end else file_size - 1
+    if start >= file_size or start > end:
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{file_size}"})
+    return start, end
+
+def _read_range(path: str, start: int, end: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk: break
+            remaining -= len(chunk)
+            yield chunk
+
+@router.get("/{name}")
+async def get_upload(name: str, request: Request, size: str = None):
+    path = os.path.join(storage.UPLOAD_DIR, name)
+    if name.startswith(".") or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Not found")
+
+    derived = await run_in_threadpool(storage.derivative, name, size) if size else None
+    if derived:
+        path, media_type = derived, "image/webp"
+    else:
+        size, media_type = None, storage.media_type(name)
+    stat, headers = _validators(name, path, size)
+    headers["X-Content-Type-Options"] = "nosniff"
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if headers["ETag"] in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range == headers["ETag"]):
+        byte_range = _byte_range(range_header, stat.st_size)
+        if byte_range:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(_read_range(path, start, end), status_code=206, media_type=media_type, headers=headers)
+
+    return FileResponse(path, media_type=media_type, headers=headers)
@@ -82,6 +82,32 @@ class CardOut(BaseModel):
     statements: List[StatementOut] = []
     class Config: from_attributes = True
 
+class EmiInstallmentOut(BaseModel):
+    id: int
+    transaction_id: int
+    card_id: Optional[int]
+    number: int
+    months: int
+    due_date: datetime
+    amount: float
+    remaining_principal: float
+    description: str
+    card_name: Optional[str] = None
+
+class CardUtilization(BaseModel):
+    card_id: int
+    name: str
+    limit: float
+    cycle_start: datetime
+    cycle_end: datetime  # last day of the current cycle (the next statement day)
+    due_date: Optional[datetime] = None  # of the latest statement
+    billed: float
+    unbilled: float
+    emi_remaining: float = 0.0  # EMI principal not billed before the current cycle
+    outstanding: float
+    available: float
+    utilization: Optional[float] = None  # percent of limit; None when the card has no limit
+
 class CompanyCreate(BaseModel):
     name: str
     joining_date: datetime
@@ -129,7 +155,7 @@ class TransactionOut(BaseModel):
     id: int
     description: str
     amount: float
-    date: datetime
+    date: Optional[datetime]  # NULL on some legacy and imported rows
     type: str
     card_id: Optional[int]
     merchant_location: Optional[str]
@@ -139,6 +165,31 @@ class TransactionOut(BaseModel):
     attachment_path: Optional[str]
     class Config: from_attributes = True
 
+class TransactionPage(BaseModel):
+    items: List[TransactionOut]
+    next_cursor: Optional[str] = None
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+class ImportPreview(BaseModel):
+    description: str
+    amount: float
+    date: datetime
+    type: str
+    card_id: Optional[int] = None
+    merchant_location: Optional[str] = None
+    payment_mode: str
+
+class ImportResult(BaseModel):
+    format: str
+    dry_run: bool
+    imported: int  # rows inserted, or rows that would be on a dry run
+    failed: int
+    errors: List[ImportRowError]  # first importers.MAX_ERRORS only
+    preview: List[ImportPreview]  # dry run only
+
 class LendingReturnOut(BaseModel):
     id: int
     amount: float
@@ -178,10 +229,57 @@ class SubscriptionOut(BaseModel):
     logo_path: Optional[str]
     class Config: from_attributes = True
 
+# --- Search ---
+class LendingHit(BaseModel):
+    id: int
+    person_name: str
+    total_amount: float
+    lent_date: datetime
+    is_settled: bool
+    pending_amount: float
+
+class SearchResults(BaseModel):
+    # Each list is ordered best match first
+    transactions: List[TransactionOut] = []
+    lending: List[LendingHit] = []
+    subscriptions: List[SubscriptionOut] = []
+
+# --- Analytics ---
+class MonthlyPoint(BaseModel):
+    month: str  # "YYYY-MM"
+    key: str
+    label: str
+    amount: float
+    count: int
+
+class CashFlowPoint(BaseModel):
+    month: str
+    income: float
+    credits: float
+    expenses: float
+    net: float
+
+# --- Admin ---
+class ProfilingState(BaseModel):
+    enabled: bool
+    sample_rate: Optional[float] = None  # fraction of requests, 0..1; unchanged when omitted
+
+class ProfileInfo(BaseModel):
+    name: str
+    size: int
+    method: str
+    path: str
+    status: int
+    started: datetime
+    duration_ms: float
+    samples: int
+    trigger: str
+
 class DashboardStats(BaseModel):
     card_count: int
     transaction_count: int
     active_lending_count: int
     pending_lending_amount: float
     monthly_subs: float
-    last_salary: float
\ No newline at end of file
+    last_salary: float
+    class Config: from_attributes = True
\ No newline at end of file
@@ -0,0 +1,53 @@
+from sqlalchemy import column, func, literal_column, table
+from sqlalchemy.engine import Connection, Engine
+import re
+
+# Full-text search for GET /api/search. Each searchable table gets an external-content FTS5 index (the text lives
+# only in the base table) kept in sync by triggers, so every write path, bulk import included, updates it.
+# Queries are a prefix match on every word, ranked by bm25 with the description weighted over the location.
+
+# base table -> (fts table, indexed columns, bm25 column weights)
+INDEXES = {
+    "transactions": ("transactions_fts", ("description", "merchant_location"), (10.0, 4.0)),
+    "lending": ("lending_fts", ("person_name",), (1.0,)),
+    "subscriptions": ("subscriptions_fts", ("name",), (1.0,)),
+}
+
+def _ddl(base: str, fts: str, columns) -> list:
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    return [
+        # prefix='2 3' keeps short prefix queries ("am*", "uber*") off the full-term scan
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{base}', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {base} BEGIN INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {base} BEGIN INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {base} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+    ]
+
+def ensure(conn: Connection):
+    # Creates missing indexes and triggers; an index created here is filled from its existing rows
+    existing = {row[0] for row in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for base, (fts, columns, _) in INDEXES.items():
+        for statement in _ddl(base, fts, columns):
+            conn.exec_driver_sql(statement)
+        if fts not in existing:
+            conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+def rebuild(engine: Engine):
+    with engine.begin() as conn:
+        for fts, _, _ in INDEXES.values():
+            conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+def match_query(q: str):
+    # User text -> FTS5 query: every word quoted (so operators and punctuation are inert) and prefix-matched
+    words = re.findall(r"\w+", q or "")
+    return " ".join(f'"{w}"*' for w in words) or None
+
+def matching(base: str, model, query: str):
+    # -> (join target, onclause, MATCH condition, rank expression) for filtering a query on `model`
+    fts, _, weights = INDEXES[base]
+    index = table(fts, column("rowid"))
+    name = literal_column(fts)
+    return index, index.c.rowid == model.id, name.op("MATCH")(query), func.bm25(name, *weights)
@@ -0,0 +1,249 @@
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import func, inspect, literal, select, union_all, update
+from sqlalchemy.orm import Session
+from typing import NamedTuple
+import hashlib, os, re, shutil, time, uuid
+import aiofiles, aiofiles.os
+from . import metrics, models, versions
+from .config import settings
+
+UPLOAD_DIR = settings.upload_dir
+TMP_DIR = os.path.join(UPLOAD_DIR, ".tmp")
+DERIVED_DIR = os.path.join(UPLOAD_DIR, ".derived")
+
+IMAGE_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif", "image/heic", "image/heif"}
+DOCUMENT_TYPES = IMAGE_TYPES | {"application/pdf"}
+
+# kind -> (max bytes, accepted content types)
+LIMITS = {
+    "image": (settings.max_image_size, IMAGE_TYPES),
+    "document": (settings.max_document_size, DOCUMENT_TYPES),
+}
+
+# Leading bytes of each accepted format. The type is always detected from these, never taken from the client's
+# Content-Type or file name, so nothing else is stored or served back.
+MAGIC = [(re.compile(pattern, re.S), ctype) for pattern, ctype in [
+    (rb"%PDF-", "application/pdf"),
+    (rb"\xff\xd8\xff", "image/jpeg"),
+    (rb"\x89PNG\r\n\x1a\n", "image/png"),
+    (rb"GIF8[79]a", "image/gif"),
+    (rb"RIFF.{4}WEBP", "image/webp"),
+    (rb".{4}ftyphei[cx]", "image/heic"),
+    (rb".{4}ftypm[is]f1", "image/heif"),
+]]
+
+# Stored blobs get the extension of their detected type
+EXTENSIONS = {
+    "application/pdf": ".pdf", "image/jpeg": ".jpg", "image/png": ".png", "image/gif": ".gif",
+    "image/webp": ".webp", "image/heic": ".heic", "image/heif": ".heif",
+}
+_MEDIA_TYPES = {**{ext: ctype for ctype, ext in EXTENSIONS.items()}, ".jpeg": "image/jpeg"}
+
+# Blobs are named <sha256><ext>, so identical uploads share one file
+CONTENT_NAME = re.compile(r"^[0-9a-f]{64}(\.[\w-]+)?$")
+
+# Derivative name -> longest edge in pixels, for /uploads/<name>?size=...
+DERIVATIVE_SIZES = {"thumb": 160, "preview": 800}
+RESIZABLE = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+
+class StoredUpload(NamedTuple):
+    path: str  # file name inside UPLOAD_DIR, as stored in the *_path columns
+    size: int
+    digest: str  # sha256 hex
+
+def _content_type(head: bytes):
+    return next((ctype for magic, ctype in MAGIC if magic.match(head)), None)
+
+def media_type(name: str) -> str:
+    # What a stored file is served as; only the accepted formats are served as themselves, anything else
+    # (a legacy upload with another extension) as a download
+    return _MEDIA_TYPES.get(os.path.splitext(name)[1].lower(), "application/octet-stream")
+
+async def save_upload(upload: UploadFile, kind: str = "document") -> StoredUpload:
+    # Streams the upload in chunks (disk-spooled reads run in the threadpool), checking type and
+    # size as it goes, into a temp file that is atomically renamed to its content hash once complete.
+    max_size, allowed = LIMITS[kind]
+    ctype = None
+    tmp_path = os.path.join(TMP_DIR, f"{uuid.uuid4()}.part")
+    digest = hashlib.sha256()
+    size = 0
+    started = time.perf_counter()
+    await aiofiles.os.makedirs(TMP_DIR, exist_ok=True)
+    try:
+        async with aiofiles.open(tmp_path, "wb") as out:
+            while chunk := await upload.read(settings.upload_chunk_size):
+                if size == 0:
+                    ctype = _content_type(chunk)
+                    if ctype not in allowed: raise HTTPException(status_code=415, detail=f"Unsupported file type for {upload.filename}")
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(status_code=413, detail=f"{upload.filename} exceeds {max_size // (1024 * 1024)} MB")
+                digest.update(chunk)
+                await out.write(chunk)
+        if ctype is None: raise HTTPException(status_code=415, detail=f"{upload.filename} is empty")
+        name = f"{digest.hexdigest()}{EXTENSIONS[ctype]}"
+        final_path = os.path.join(UPLOAD_DIR, name)
+        if os.path.exists(final_path):
+            # Already stored: keep the existing blob, refresh its mtime so release()/GC grace covers the new reference
+            await aiofiles.os.remove(tmp_path)
+            os.utime(final_path)
+        else:
+            await aiofiles.os.replace(tmp_path, final_path)
+    except BaseException:
+        if os.path.exists(tmp_path): await aiofiles.os.remove(tmp_path)
+        raise
+    metrics.upload_bytes.observe(size, kind)
+    metrics.upload_seconds.observe(time.perf_counter() - started, kind)
+    return StoredUpload(name, size, digest.hexdigest())
+
+# --- Derivatives ---
+def _derived_path(name: str, size_name: str) -> str:
+    return os.path.join(DERIVED_DIR, f"{os.path.splitext(name)[0]}-{size_name}.webp")
+
+def derivative(name: str, size_name: str):
+    # Path of a cached downscaled WebP copy, generated on first use; None when the file is not an image.
+    # Blocking (Pillow), so async callers run it in the threadpool.
+    if size_name not in DERIVATIVE_SIZES or os.path.splitext(name)[1].lower() not in RESIZABLE:
+        return None
+    derived = _derived_path(name, size_name)
+    if not os.path.exists(derived):
+        from PIL import Image, ImageOps
+        os.makedirs(DERIVED_DIR, exist_ok=True)
+        edge = DERIVATIVE_SIZES[size_name]
+        tmp_path = os.path.join(TMP_DIR, f"{uuid.uuid4()}.webp")
+        os.makedirs(TMP_DIR, exist_ok=True)
+        try:
+            with Image.open(os.path.join(UPLOAD_DIR, name)) as img:
+                img = ImageOps.exif_transpose(img)
+                img.thumbnail((edge, edge))
+                img.save(tmp_path, "WEBP", quality=80)
+            os.replace(tmp_path, derived)
+        except Exception:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+            return None
+    return derived
+
+# --- References ---
+def _owned_paths():
+    # One (owner_id, path, collection) select per *_path column; child tables resolve their owner through the
+    # parent, and collection is the versions.py counter whose list shows the path
+    Card, Stmt, Payment, Lending = models.Card, models.CardStatement, models.StatementPayment, models.Lending
+    def owned(collection, owner_id, path):
+        return select(owner_id, path.label("path"), literal(collection).label("collection"))
+    return [
+        owned("cards", Card.owner_id, Card.front_image_path),
+        owned("cards", Card.owner_id, Card.back_image_path),
+        owned("cards", Card.owner_id, Stmt.attachment_path).join(Stmt.card),
+        owned("cards", Card.owner_id, Stmt.payment_proof_path).join(Stmt.card),
+        owned("cards", Card.owner_id, Payment.proof_path).join(Payment.statement).join(Stmt.card),
+        owned("transactions", models.Transaction.owner_id, models.Transaction.attachment_path),
+        owned("lending", Lending.owner_id, models.LendingReturn.proof_image_path).join(models.LendingReturn.lending),
+        owned("salary", models.Company.owner_id, models.Company.logo_path),
+        owned("salary", models.Salary.owner_id, models.Salary.attachment_path),
+        owned("subscriptions", models.Subscription.owner_id, models.Subscription.logo_path),
+    ]
+
+def _all_references():
+    return union_all(*_owned_paths()).subquery()
+
+def reference_count(db: Session, path: str) -> int:
+    refs = _all_references()
+    return db.execute(select(func.count()).select_from(refs).where(refs.c.path == path)).scalar()
+
+def collect_paths(*objs):
+    # Every stored file an object (and whatever delete-orphan cascades take with it) points at
+    paths = []
+    for obj in objs:
+        mapper = inspect(obj).mapper
+        paths += [getattr(obj, attr.key) for attr in mapper.column_attrs if attr.key.endswith("_path")]
+        for rel in mapper.relationships:
+            if rel.cascade.delete_orphan:
+                paths += collect_paths(*getattr(obj, rel.key))
+    return [p for p in paths if p]
+
+def _remove(path: str) -> int:
+    full = os.path.join(UPLOAD_DIR, path)
+    for size_name in DERIVATIVE_SIZES:
+        derived = _derived_path(path, size_name)
+        if os.path.exists(derived): os.remove(derived)
+    try:
+        size = os.path.getsize(full)
+        os.remove(full)
+        return size
+    except FileNotFoundError:
+        return 0
+
+def release(db: Session, *paths):
+    # Call after the commit that dropped the references. Blobs touched within the grace period
+    # may be about to gain a reference from a concurrent upload, so those are left to the GC.
+    now = time.time()
+    for path in set(p for p in paths if p):
+        full = os.path.join(UPLOAD_DIR, path)
+        if not os.path.isfile(full) or now - os.path.getmtime(full) < settings.upload_gc_grace:
+            continue
+        if reference_count(db, path) == 0:
+            _remove(path)
+
+# --- Maintenance (python -m app.cli gc-uploads / dedupe-uploads / disk-usage) ---
+def collect_garbage(db: Session, dry_run: bool = False):
+    # Mark (every referenced path) and sweep (unreferenced files older than the grace period)
+    referenced = set(db.execute(select(_all_references().c.path)).scalars())
+    cutoff = time.time() - settings.upload_gc_grace
+    removed, freed = [], 0
+    for entry in os.scandir(UPLOAD_DIR):
+        if not entry.is_file() or entry.name.startswith(".") or entry.name in referenced or entry.stat().st_mtime > cutoff:
+            continue
+        removed.append(entry.name)
+        freed += entry.stat().st_size if dry_run else _remove(entry.name)
+    if os.path.isdir(TMP_DIR):
+        for entry in os.scandir(TMP_DIR):
+            # Abandoned partial uploads
+            if entry.is_file() and entry.stat().st_mtime < cutoff and not dry_run:
+                os.remove(entry.path)
+    return removed, freed
+
+def dedupe_legacy(db: Session):
+    # Rename pre-content-addressing (uuid-named) files to their hash and repoint every column at it
+    renamed, freed = 0, 0
+    paths = set(db.execute(select(_all_references().c.path)).scalars())
+    columns = [attr.class_attribute for mapper in models.Base.registry.mappers for attr in mapper.column_attrs if attr.key.endswith("_path")]
+    for path in paths:
+        full = os.path.join(UPLOAD_DIR, path or "")
+        if not path or CONTENT_NAME.match(path) or not os.path.isfile(full):
+            continue
+        digest = hashlib.sha256()
+        with open(full, "rb") as f:
+            while chunk := f.read(settings.upload_chunk_size):
+                digest.update(chunk)
+        name = f"{digest.hexdigest()}{os.path.splitext(path)[1].lower()}"
+        target = os.path.join(UPLOAD_DIR, name)
+        existed = os.path.exists(target)
+        if not existed:
+            # Copied, not moved: until the commit below the rows still point at the legacy file.
+            # A crash in between leaves an unreferenced copy for gc-uploads, never a dangling row.
+            os.makedirs(TMP_DIR, exist_ok=True)
+            tmp_path = os.path.join(TMP_DIR, f"{uuid.uuid4()}.part")
+            shutil.copyfile(full, tmp_path)
+            os.replace(tmp_path, target)
+        # Lists showing the old name must not be answered with 304 from a stale ETag
+        refs = _all_references()
+        for owner_id, collection in db.execute(select(refs.c.owner_id, refs.c.collection).where(refs.c.path == path).distinct()).all():
+            versions.bump(db, owner_id, collection)
+        for column in columns:
+            db.execute(update(column.class_).where(column == path).values({column.key: name}))
+        db.commit()
+        size = _remove(path)
+        if existed: freed += size
+        renamed += 1
+    return renamed, freed
+
+def usage_by_user(db: Session):
+    # user_id -> (file count, bytes); a blob shared by several of one user's rows counts once
+    refs = _all_references()
+    usage = {}
+    for owner_id, path in db.execute(select(refs.c.owner_id, refs.c.path).where(refs.c.path.is_not(None)).distinct()):
+        full = os.path.join(UPLOAD_DIR, path)
+        size = os.path.getsize(full) if os.path.isfile(full) else 0
+        count, total = usage.get(owner_id, (0, 0))
+        usage[owner_id] = (count + 1, total + size)
+    return usage
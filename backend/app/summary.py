@@ -0,0 +1,82 @@
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from . import models
+
+# Per-user dashboard counters. Routers call apply()/refresh_last_salary() inside the same
+# transaction as their write, so the dashboard is a single primary-key read.
+
+FIELDS = ("card_count", "transaction_count", "active_lending_count", "pending_lending_amount", "monthly_subs", "last_salary")
+
+def _last_salary(user_id):
+    return select(models.Salary.amount).where(models.Salary.owner_id == user_id).order_by(models.Salary.date_added.desc()).limit(1).scalar_subquery()
+
+def compute(db: Session, user_id: int) -> dict:
+    card_count = db.query(func.count(models.Card.id)).filter(models.Card.owner_id == user_id).scalar()
+    tx_count = db.query(func.count(models.Transaction.id)).filter(models.Transaction.owner_id == user_id).scalar()
+    active_lending, pending = db.query(
+        func.count(models.Lending.id),
+        func.coalesce(func.sum(models.Lending.total_amount - func.coalesce(models.Lending.returned_amount, 0.0)), 0.0)
+    ).filter(models.Lending.owner_id == user_id, models.Lending.is_settled == False).one()
+    monthly_subs = db.query(func.coalesce(func.sum(models.Subscription.amount), 0.0)).filter(models.Subscription.owner_id == user_id, models.Subscription.active == True).scalar()
+    last_salary = db.query(func.coalesce(_last_salary(user_id), 0.0)).scalar()
+    return {
+        "card_count": card_count,
+        "transaction_count": tx_count,
+        "active_lending_count": active_lending,
+        "pending_lending_amount": pending,
+        "monthly_subs": monthly_subs,
+        "last_salary": last_salary
+    }
+
+def rebuild(db: Session, user_id: int) -> models.UserSummary:
+    values = compute(db, user_id)
+    db.execute(insert(models.UserSummary).values(user_id=user_id, **values).on_conflict_do_update(index_elements=["user_id"], set_=values))
+    return db.get(models.UserSummary, user_id, populate_existing=True)
+
+def get(db: Session, user_id: int, write_session=None) -> models.UserSummary:
+    row = db.get(models.UserSummary, user_id)
+    if row is None:
+        # First visit (or a pre-summary database): build it once from the source tables.
+        # write_session is a session factory, so read-only callers only touch the writer on a miss.
+        if write_session is None:
+            row = rebuild(db, user_id)
+            db.commit()
+            return row
+        with write_session() as write_db:
+            row = rebuild(write_db, user_id)
+            write_db.commit()
+            write_db.refresh(row)
+    return row
+
+def apply(db: Session, user_id: int, **deltas):
+    # Atomic "col = col + delta"; a missing row is left alone and rebuilt on the next read
+    values = {name: getattr(models.UserSummary, name) + delta for name, delta in deltas.items() if delta}
+    if values:
+        db.execute(update(models.UserSummary).where(models.UserSummary.user_id == user_id).values(values))
+
+def lending_state(db: Session, lending: models.Lending):
+    # (active count, pending amount) a single lending contributes; callers diff before/after a write
+    if lending.is_settled or lending.id is None:
+        return 0, 0.0
+    return 1, lending.total_amount - (lending.returned_amount or 0.0)
+
+def apply_lending(db: Session, user_id: int, before, after):
+    apply(db, user_id, active_lending_count=after[0] - before[0], pending_lending_amount=after[1] - before[1])
+
+def refresh_last_salary(db: Session, user_id: int):
+    db.flush()
+    db.execute(update(models.UserSummary).where(models.UserSummary.user_id == user_id).values(last_salary=func.coalesce(_last_salary(user_id), 0.0)))
+
+def check(db: Session, user_id: int = None):
+    # Compare stored rows against a full recompute; returns (user_id, field, stored, expected)
+    q = db.query(models.UserSummary)
+    if user_id is not None: q = q.filter(models.UserSummary.user_id == user_id)
+    mismatches = []
+    for row in q.all():
+        expected = compute(db, row.user_id)
+        for name in FIELDS:
+            stored = getattr(row, name) or 0
+            if abs(stored - expected[name]) > 1e-6:
+                mismatches.append((row.user_id, name, stored, expected[name]))
+    return mismatches
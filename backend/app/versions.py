@@ -0,0 +1,51 @@
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+import hashlib
+from . import auth, database, models
+
+# Per-user collection version counters behind the ETags on list endpoints. Every write bumps its collection
+# inside the same transaction (like summary.apply), so a GET can answer If-None-Match with 304 after one
+# primary-key lookup, before any list query runs.
+
+COLLECTIONS = ("cards", "transactions", "lending", "subscriptions", "salary")
+
+def bump(db: Session, user_id: int, *collections):
+    V = models.CollectionVersion
+    for collection in collections:
+        stmt = insert(V).values(user_id=user_id, collection=collection, version=1)
+        db.execute(stmt.on_conflict_do_update(index_elements=["user_id", "collection"], set_={"version": V.version + 1}))
+
+def current(db: Session, user_id: int, collection: str) -> int:
+    V = models.CollectionVersion
+    return db.scalar(select(V.version).where(V.user_id == user_id, V.collection == collection)) or 0
+
+def stamp(db: Session, user_id: int, *collections) -> tuple:
+    # Versions of several collections in one query, for tagging cached values derived from them
+    V = models.CollectionVersion
+    found = dict(db.execute(select(V.collection, V.version).where(V.user_id == user_id, V.collection.in_(collections))).all())
+    return tuple(found.get(c, 0) for c in collections)
+
+def etag(user_id: int, collection: str, version: int, path: str, query: str = "") -> str:
+    # Path and query string are part of the tag: endpoints sharing a collection counter, a filtered page or
+    # another cursor are all different representations
+    variant = hashlib.blake2b(f"{path}?{query}".encode(), digest_size=6).hexdigest()
+    return f'W/"{collection}-{user_id}-{version}-{variant}"'
+
+def _matches(if_none_match: str, tag: str) -> bool:
+    # Weak comparison (RFC 9110 13.1.2)
+    if not if_none_match: return False
+    if if_none_match.strip() == "*": return True
+    return tag.removeprefix("W/") in {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+
+def conditional(collection: str):
+    # Route dependency: sets ETag / Cache-Control, or ends the request with 304 when the client's copy is current.
+    # The version is read before the list, so a write landing in between only makes the next check miss.
+    def check(request: Request, response: Response, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_read_db)):
+        tag = etag(current_user.id, collection, current(db, current_user.id, collection), request.url.path, str(request.url.query))
+        headers = {"ETag": tag, "Cache-Control": "private, no-cache"}
+        if _matches(request.headers.get("if-none-match"), tag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+    return check
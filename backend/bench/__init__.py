@@ -0,0 +1,26 @@
+# Benchmarks, run from the backend directory: python -m bench.<name>
+import os, socket, subprocess, sys, time
+import requests
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(workdir: str, **env):
+    # uvicorn on a free port with its database and uploads inside workdir; extra CC_TRACK_* settings via env
+    port = _free_port()
+    env = dict(os.environ,
+               CC_TRACK_DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+               CC_TRACK_UPLOAD_DIR=os.path.join(workdir, "uploads"),
+               **env)
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"], env=env)
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(f"{base}/docs", timeout=1)
+            return proc, base
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server did not start")
@@ -0,0 +1,130 @@
+# Index audit: drives every router (the bench_suite scenarios plus the write endpoints) against a generated
+# account, captures each distinct SQL statement the app runs and checks its EXPLAIN QUERY PLAN. A full SCAN of
+# an application table is reported with the scenario that issued it, and the run exits 1, so a new query that
+# misses the indexes fails here rather than in production.
+#   cd backend && python -m bench.audit_indexes [--transactions N] [--verbose]
+import argparse, os, re, sqlite3, tempfile
+from datetime import datetime
+
+# Tables only ever read whole (a handful of rows by construction)
+ALLOWED = {"schema_migrations"}
+
+def writes(client, headers, latest):
+    # Write endpoints bench_suite leaves out; each undoes what it created. Most of them answer with a message,
+    # so latest(table) looks up the id just created.
+    now = datetime.now().isoformat()
+    card = {"name": "Audit", "bank_name": "b", "card_network": "Visa", "card_type": "credit", "card_number": "4111111111111111",
+            "expiry_date": "12/30", "owner_name": "o", "limit": "1000", "statement_date": "5", "payment_due_date": "25"}
+
+    def ok(response):
+        response.raise_for_status()
+        return response
+
+    def cards():
+        ok(client.post("/api/cards/", headers=headers, data=card))
+        card_id = latest("cards")
+        ok(client.put(f"/api/cards/{card_id}", headers=headers, data={**card, "name": "Audit 2"}))
+        ok(client.post(f"/api/cards/{card_id}/statements", headers=headers, data={"month": "Jan", "generated_date": now, "due_date": now, "total_due": "500"}))
+        stmt_id = latest("card_statements")
+        ok(client.post(f"/api/cards/statements/{stmt_id}/payments", headers=headers, data={"amount": "100", "reference": "r"}))
+        ok(client.delete(f"/api/cards/statements/{stmt_id}/payments/{latest('statement_payments')}", headers=headers))
+        ok(client.delete(f"/api/cards/statements/{stmt_id}", headers=headers))
+        return ok(client.delete(f"/api/cards/{card_id}", headers=headers))
+
+    def lending():
+        ok(client.post("/api/lending/", headers=headers, data={"person_name": "Audit", "total_amount": "100"}))
+        loan_id = latest("lending")
+        ok(client.put(f"/api/lending/{loan_id}", headers=headers, data={"person_name": "Audit", "total_amount": "120"}))
+        ok(client.post(f"/api/lending/{loan_id}/return", headers=headers, data={"amount": "20"}))
+        ok(client.delete(f"/api/lending/{loan_id}/return/{latest('lending_returns')}", headers=headers))
+        return ok(client.delete(f"/api/lending/{loan_id}", headers=headers))
+
+    def salary():
+        ok(client.post("/api/salary/companies", headers=headers, data={"name": "Audit", "joining_date": now}))
+        company_id = latest("companies")
+        ok(client.put(f"/api/salary/companies/{company_id}", headers=headers, data={"name": "Audit 2", "joining_date": now, "is_current": "true"}))
+        ok(client.post("/api/salary/slips", headers=headers, data={"company_id": company_id, "amount": "1000", "month": "January", "year": "2024"}))
+        slip_id = latest("salary")
+        ok(client.delete(f"/api/salary/slips/{slip_id}", headers=headers))
+        return ok(client.delete(f"/api/salary/companies/{company_id}", headers=headers))
+
+    def subscriptions():
+        ok(client.post("/api/subscriptions/", headers=headers, data={"name": "Audit", "amount": "99"}))
+        sub_id = latest("subscriptions")
+        ok(client.put(f"/api/subscriptions/{sub_id}", headers=headers, data={"name": "Audit", "amount": "109", "frequency": "Monthly"}))
+        return ok(client.delete(f"/api/subscriptions/{sub_id}", headers=headers))
+
+    def settings():
+        current = ok(client.get("/api/settings/", headers=headers)).json()
+        return ok(client.put("/api/settings/", headers=headers, json=current))
+
+    return {"cards.write": cards, "lending.write": lending, "salary.write": salary, "subscriptions.write": subscriptions, "settings.update": settings}
+
+def table_scans(plan, tables) -> list:
+    # plan rows are (id, parent, notused, detail); SCAN of a subquery, CTE alias or FTS5 index is not a table scan
+    return [detail for *_, detail in plan
+            if detail.startswith("SCAN ") and "VIRTUAL TABLE" not in detail and detail.split()[1] in tables - ALLOWED]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transactions", type=int, default=2000)
+    parser.add_argument("--verbose", action="store_true", help="Print every statement's plan")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, "audit.db")
+    os.environ["CC_TRACK_DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["CC_TRACK_UPLOAD_DIR"] = os.path.join(workdir, "uploads")
+    os.environ["CC_TRACK_REMINDERS_ENABLED"] = "false"
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from app import database, models, reminders
+    from app.main import app
+    from .bench_suite import scenarios
+    from .datagen import generate
+
+    uid = generate("bench", "bench", args.transactions)["user_id"]  # the credentials the bench_suite login scenario uses
+    with database.ReadSessionLocal() as db:
+        ids = {
+            "card": db.query(models.Card.id).filter(models.Card.owner_id == uid).order_by(models.Card.id).first()[0],
+            "transaction": db.query(models.Transaction.id).filter(models.Transaction.owner_id == uid).order_by(models.Transaction.id).first()[0],
+            "company": db.query(models.Company.id).filter(models.Company.owner_id == uid).first()[0],
+            "image": next(name for name in os.listdir(os.environ["CC_TRACK_UPLOAD_DIR"]) if name.endswith(".png")),
+        }
+
+    # statement text -> (first parameters seen, scenarios that ran it)
+    seen, current = {}, [None]
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if executemany or not re.match(r"\s*(SELECT|UPDATE|DELETE|WITH)\b", statement, re.I): return
+        entry = seen.setdefault(statement, (parameters, set()))
+        entry[1].add(current[0])
+    for engine in (database.engine, database.read_engine, database.async_engine.sync_engine):
+        event.listen(engine, "before_cursor_execute", capture)
+
+    conn = sqlite3.connect(db_path)
+    latest = lambda table: conn.execute(f"SELECT max(id) FROM {table}").fetchone()[0]  # not through the app, so not audited
+    with TestClient(app) as client:
+        token = client.post("/auth/token", data={"username": "bench", "password": "bench"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        requests = {**scenarios(client, headers, ids), **writes(client, headers, latest)}
+        for name, request in requests.items():
+            current[0] = name
+            request().raise_for_status()
+        # The reminder scan runs outside any request but filters the same tables
+        current[0] = "reminders.collect"
+        with database.ReadSessionLocal() as db: reminders.collect(db, datetime.now())
+
+    tables = {name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    failures = 0
+    for statement, (parameters, names) in seen.items():
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+        scans = table_scans(plan, tables)
+        if scans or args.verbose:
+            print(f"{'FULL SCAN' if scans else 'ok'} [{', '.join(sorted(n for n in names if n))}] {' '.join(statement.split())[:300]}")
+            for *_, detail in plan: print(f"    {detail}")
+        failures += bool(scans)
+    print(f"{len(seen)} distinct statements from {len(requests) + 1} scenarios, {failures} with full table scans")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,70 @@
+# Mixed read/upload load against a real uvicorn process, with the SQLite tuning on and off.
+#   cd backend && python -m bench.bench_concurrency [--readers 8 --writers 2 --seconds 10]
+import argparse, os, tempfile, threading, time
+import requests
+from . import start_server
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)] * 1000 if values else 0.0
+
+def run(tuned: bool, readers: int, writers: int, seconds: float, seed_rows: int):
+    proc, base = start_server(tempfile.mkdtemp(), CC_TRACK_SQLITE_TUNING=str(tuned).lower())
+    try:
+        token = requests.post(f"{base}/auth/signup", json={"username": "bench", "password": "bench"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        for i in range(seed_rows):
+            requests.post(f"{base}/api/transactions/", headers=headers, data={"description": f"seed {i}", "amount": i, "date_str": "2024-01-01T00:00:00", "type": "expense"})
+
+        latencies = {"read": [], "write": []}
+        errors = []
+        deadline = time.perf_counter() + seconds
+
+        def reader(n):
+            session = requests.Session()
+            paths = ["/api/transactions/", "/api/dashboard/"]
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                r = session.get(base + paths[n % 2], headers=headers)
+                latencies["read"].append(time.perf_counter() - start)
+                if r.status_code != 200: errors.append(r.status_code)
+                n += 1
+
+        def writer(n):
+            session = requests.Session()
+            while time.perf_counter() < deadline:
+                # Unique content each time so every upload really hits the disk and the writer connection
+                body = os.urandom(64 * 1024)
+                start = time.perf_counter()
+                r = session.post(f"{base}/api/transactions/", headers=headers,
+                                 data={"description": f"w{n}", "amount": 1, "date_str": "2024-02-01T00:00:00", "type": "expense"},
+                                 files={"attachment": ("r.pdf", b"%PDF-" + body, "application/pdf")})
+                latencies["write"].append(time.perf_counter() - start)
+                if r.status_code != 200: errors.append(r.status_code)
+                n += 1
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)] + [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+
+        label = "tuned" if tuned else "default"
+        for kind, values in latencies.items():
+            print(f"{label:<8} {kind:<5} {len(values) / seconds:8.1f} req/s  p50 {_percentile(values, 0.5):7.1f} ms  p99 {_percentile(values, 0.99):7.1f} ms")
+        if errors:
+            print(f"{label:<8} {len(errors)} error(s): {sorted(set(errors))}")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--seed-rows", type=int, default=500)
+    args = parser.parse_args()
+    for tuned in (False, True):
+        run(tuned, args.readers, args.writers, args.seconds, args.seed_rows)
+
+if __name__ == "__main__":
+    main()
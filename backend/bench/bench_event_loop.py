@@ -0,0 +1,55 @@
+# A write stuck waiting for the database must not stall other requests. Another connection holds the
+# SQLite write lock while one POST tries to commit; concurrent GET latency is measured meanwhile.
+#   cd backend && python -m bench.bench_event_loop [--hold 2]
+import argparse, os, sqlite3, tempfile, threading, time
+import requests
+from . import start_server
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hold", type=float, default=2.0, help="Seconds the write lock is held")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    proc, base = start_server(workdir)
+    try:
+        token = requests.post(f"{base}/auth/signup", json={"username": "bench", "password": "bench"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        for i in range(50):
+            requests.post(f"{base}/api/transactions/", headers=headers, data={"description": f"seed {i}", "amount": i, "type": "expense"})
+        requests.get(f"{base}/api/transactions/", headers=headers)
+
+        locker = sqlite3.connect(os.path.join(workdir, "bench.db"), isolation_level=None, check_same_thread=False)
+        locker.execute("BEGIN IMMEDIATE")
+        write = {}
+
+        def slow_write():
+            start = time.perf_counter()
+            r = requests.post(f"{base}/api/transactions/", headers=headers, data={"description": "blocked", "amount": 1, "type": "expense"})
+            write["status"], write["seconds"] = r.status_code, time.perf_counter() - start
+
+        writer = threading.Thread(target=slow_write)
+        writer.start()
+        time.sleep(0.2)  # let the POST reach its commit
+
+        latencies = []
+        deadline = time.perf_counter() + args.hold - 0.2
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            requests.get(f"{base}/api/transactions/", headers=headers).raise_for_status()
+            latencies.append(time.perf_counter() - start)
+        locker.execute("COMMIT")
+        writer.join()
+
+        latencies.sort()
+        print(f"blocked POST: {write['status']} after {write['seconds']:.2f} s (lock held {args.hold:.1f} s)")
+        print(f"GETs meanwhile: {len(latencies)}, p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms")
+        ok = latencies[-1] < args.hold / 2
+        print("OK: reads were not held up by the waiting write" if ok else "FAIL: reads waited for the write")
+        return 0 if ok else 1
+    finally:
+        proc.terminate()
+        proc.wait()
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,76 @@
+# Reminder delivery end to end against a local stub ntfy server: one batched message per user, retried
+# after server errors, and never sent twice across scans.
+#   cd backend && python -m bench.bench_reminders [--fail-first 2]
+import argparse, tempfile, threading, time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from . import start_server
+
+class StubNtfy(ThreadingHTTPServer):
+    # Records every POST as (path, title, body); answers 503 to the first fail_first requests
+    def __init__(self, fail_first: int = 0):
+        self.fail_first, self.received, self.attempts = fail_first, [], 0
+        super().__init__(("127.0.0.1", 0), _Handler)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode()
+        self.server.attempts += 1
+        if self.server.attempts <= self.server.fail_first:
+            self.send_response(503)
+        else:
+            self.server.received.append((self.path, self.headers.get("Title"), body))
+            self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fail-first", type=int, default=2, help="Requests the stub answers with 503 first")
+    parser.add_argument("--scans", type=int, default=4, help="Scheduler scans to wait for")
+    args = parser.parse_args()
+
+    stub = StubNtfy(args.fail_first)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    interval = 1
+    # Retries back off 0.1 s, 0.2 s, ... so a couple of 503s are absorbed within one scan
+    proc, base = start_server(tempfile.mkdtemp(), CC_TRACK_REMINDER_INTERVAL=str(interval), CC_TRACK_NTFY_BACKOFF="0.1", CC_TRACK_NTFY_RETRIES="3")
+    try:
+        users = []
+        for name in ("alice", "bob"):
+            token = requests.post(f"{base}/auth/signup", json={"username": name, "password": "bench"}).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            requests.put(f"{base}/api/settings/", headers=headers, json={"currency": "INR", "ntfy_url": stub.url, "ntfy_topic": name}).raise_for_status()
+            card = requests.post(f"{base}/api/cards/", headers=headers, data={"name": "Card", "bank_name": "b", "card_network": "v", "card_type": "credit", "card_number": "4111111111111111", "expiry_date": "12/30", "owner_name": name, "limit": 1000}).json()
+            tomorrow = (datetime.now() + timedelta(days=1)).isoformat()
+            requests.post(f"{base}/api/cards/{card['id']}/statements", headers=headers, data={"month": "Jan", "generated_date": datetime.now().isoformat(), "due_date": tomorrow, "total_due": 500}).raise_for_status()
+            requests.post(f"{base}/api/subscriptions/", headers=headers, data={"name": "Music", "amount": 99, "renewal_date": tomorrow}).raise_for_status()
+            users.append(name)
+
+        start = time.perf_counter()
+        time.sleep(interval * args.scans)
+        per_topic = {}
+        for path, title, body in stub.received:
+            per_topic.setdefault(path.strip("/"), []).append((title, body))
+        for topic, messages in sorted(per_topic.items()):
+            for title, body in messages:
+                print(f"[{topic}] {title}\n{body}")
+        ok = sorted(per_topic) == users and all(len(m) == 1 and m[0][1].count("\n") == 1 for m in per_topic.values())
+        print(f"{stub.attempts} POST(s), {len(stub.received)} delivered in {time.perf_counter() - start:.1f} s over ~{args.scans} scans")
+        print("OK: one batched message per user, none repeated" if ok else "FAIL: missing or duplicate reminders")
+        return 0 if ok else 1
+    finally:
+        proc.terminate()
+        proc.wait()
+        stub.shutdown()
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,64 @@
+# List serialization: the previous path (ORM objects -> per-object Pydantic validation -> stdlib json) against
+# the projected orjson path (responses.py), for GET /api/transactions/?all=true at 10k and 100k rows.
+#   cd backend && python -m bench.bench_serialization [--rows 10000 100000]
+import argparse, gzip, json, os, tempfile, time, tracemalloc
+from datetime import datetime, timedelta
+
+def _measure(fn):
+    # -> (best seconds of 3, peak traced bytes, body)
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        body = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, body
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ["CC_TRACK_DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["CC_TRACK_REMINDERS_ENABLED"] = "false"
+    from typing import List
+    from pydantic import TypeAdapter
+    from sqlalchemy import insert
+    import orjson
+    from app import database, models, responses, schemas
+    database.Base.metadata.create_all(bind=database.engine)
+    T = models.Transaction
+    adapter = TypeAdapter(List[schemas.TransactionOut])
+
+    def old_path(db, owner_id):
+        objects = db.query(T).filter(T.owner_id == owner_id).order_by(T.date.desc(), T.id).all()
+        return json.dumps(adapter.dump_python(adapter.validate_python(objects, from_attributes=True), mode="json"), ensure_ascii=False, separators=(",", ":")).encode()
+
+    def new_path(db, owner_id):
+        q = db.query(*responses.columns(schemas.TransactionOut, T)).filter(T.owner_id == owner_id).order_by(T.date.desc(), T.id)
+        return orjson.dumps(responses.rows(q))
+
+    print(f"{'rows':>8} {'path':<8} {'time':>9} {'peak mem':>10} {'body':>9} {'gzip':>8}")
+    base = datetime(2020, 1, 1)
+    for owner_id, n in enumerate(args.rows, 1):
+        with database.SessionLocal() as db:
+            for start in range(0, n, 5000):
+                db.execute(insert(T), [dict(owner_id=owner_id, description=f"Purchase {i} at store", amount=i * 1.25, date=base + timedelta(minutes=i), type="expense",
+                                            card_id=1, merchant_location="Pune", payment_mode="upi", is_emi=False) for i in range(start, min(start + 5000, n))])
+            db.commit()
+        with database.ReadSessionLocal() as db:
+            results = {}
+            for name, fn in (("old", old_path), ("orjson", new_path)):
+                seconds, peak, body = _measure(lambda: fn(db, owner_id))
+                db.expunge_all()
+                results[name] = body
+                print(f"{n:>8} {name:<8} {seconds * 1000:>7.0f}ms {peak / 2**20:>8.1f}MB {len(body) / 2**20:>7.1f}MB {len(gzip.compress(body, 6)) / 2**20:>6.1f}MB")
+            assert json.loads(results["old"]) == json.loads(results["orjson"]), "outputs differ"
+
+if __name__ == "__main__":
+    main()
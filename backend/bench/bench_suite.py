@@ -0,0 +1,149 @@
+# Endpoint benchmark suite: generates an account with bench.datagen, then drives every router in-process
+# through the ASGI app and records p50/p99 latency, SQL statements per request and peak RSS per scenario.
+# Results are compared with bench/baselines/<scale>.json; slower p99 (beyond --tolerance) or more queries
+# than the baseline are flagged and make the run exit 1.
+#   cd backend && python -m bench.bench_suite [--scale small|medium|large|tiny | --transactions N] [--save]
+import argparse, json, os, platform, resource, sys, tempfile, time
+from datetime import date, datetime, timedelta
+from .datagen import SCALES
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+# Differences smaller than this are noise on any machine
+MIN_SLOWDOWN_MS = 2.0
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)] * 1000
+
+def _rss_mb() -> float:
+    # Peak resident set size of this process so far (ru_maxrss is KB on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (2**20 if sys.platform == "darwin" else 2**10)
+
+def scenarios(client, headers, ids):
+    # name -> callable making one request; writes undo themselves so every iteration sees the same data
+    today = date.today()
+    tx_form = {"description": "Bench purchase", "amount": "123.45", "type": "expense", "card_id": str(ids["card"]), "date_str": datetime.now().isoformat()}
+
+    def create_delete_transaction():
+        tx = client.post("/api/transactions/", headers=headers, data=tx_form)
+        tx.raise_for_status()
+        client.delete(f"/api/transactions/{tx.json()['id']}", headers=headers).raise_for_status()
+        return tx
+
+    csv = "Date,Description,Amount\n" + "".join(f"{today.isoformat()},Import {i},-{i + 1}.50\n" for i in range(50))
+    get = lambda path, **params: lambda: client.get(path, headers=headers, params=params)
+    return {
+        "auth.login": lambda: client.post("/auth/token", data={"username": "bench", "password": "bench"}),
+        "dashboard": get("/api/dashboard/"),
+        "cards.list": get("/api/cards/"),
+        "cards.utilization": get("/api/cards/utilization"),
+        "transactions.page": get("/api/transactions/", limit=50),
+        "transactions.filtered": get("/api/transactions/", limit=50, card_id=ids["card"], min_amount=500, date_from=(today - timedelta(days=365)).isoformat()),
+        "transactions.all": get("/api/transactions/", all="true"),
+        "transactions.create+delete": create_delete_transaction,
+        "transactions.update": lambda: client.put(f"/api/transactions/{ids['transaction']}", headers=headers, data={**tx_form, "description": "Bench update"}),
+        "transactions.import.dry_run": lambda: client.post("/api/transactions/import", headers=headers, data={"dry_run": "true"}, files={"file": ("s.csv", csv.encode(), "text/csv")}),
+        "lending.list": get("/api/lending/"),
+        "subscriptions.list": get("/api/subscriptions/"),
+        "salary.companies": get("/api/salary/companies"),
+        "salary.slips": get(f"/api/salary/slips/{ids['company']}"),
+        "settings.get": get("/api/settings/"),
+        "analytics.monthly": get("/api/analytics/monthly", dimension="card"),
+        "analytics.cashflow": get("/api/analytics/cashflow"),
+        "installments.upcoming": get("/api/installments/"),
+        "search": get("/api/search/", q="amaz"),
+        "export.ndjson": get("/api/export/", format="ndjson"),
+        "uploads.thumb": get(f"/uploads/{ids['image']}", size="thumb"),
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--transactions", type=int, help="Override the scale's transaction count (results are not compared)")
+    parser.add_argument("--iterations", type=int, default=30, help="Requests per scenario (login does a fifth, bulk reads a third)")
+    parser.add_argument("--only", help="Comma-separated scenario names")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed p99 slowdown over the baseline (0.5 = 50%%)")
+    parser.add_argument("--save", action="store_true", help="Write the results as the new baseline for this scale")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ["CC_TRACK_DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["CC_TRACK_UPLOAD_DIR"] = os.path.join(workdir, "uploads")
+    os.environ["CC_TRACK_REMINDERS_ENABLED"] = "false"
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from app import database, models
+    from app.main import app
+    from .datagen import generate
+
+    transactions = args.transactions or SCALES[args.scale]
+    started = time.perf_counter()
+    counts = generate("bench", "bench", transactions)
+    print(f"generated {', '.join(f'{v} {k}' for k, v in counts.items() if k != 'user_id')} in {time.perf_counter() - started:.1f} s")
+
+    queries = [0]
+    def count(*_): queries[0] += 1
+    for engine in (database.engine, database.read_engine, database.async_engine.sync_engine):
+        event.listen(engine, "before_cursor_execute", count)
+
+    with database.ReadSessionLocal() as db:
+        uid = counts["user_id"]
+        ids = {
+            "card": db.query(models.Card.id).filter(models.Card.owner_id == uid).order_by(models.Card.id).first()[0],
+            "transaction": db.query(models.Transaction.id).filter(models.Transaction.owner_id == uid).order_by(models.Transaction.id).first()[0],
+            "company": db.query(models.Company.id).filter(models.Company.owner_id == uid).first()[0],
+            "image": next(name for name in os.listdir(os.environ["CC_TRACK_UPLOAD_DIR"]) if name.endswith(".png")),
+        }
+
+    results = {}
+    with TestClient(app) as client:
+        token = client.post("/auth/token", data={"username": "bench", "password": "bench"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        wanted = set(args.only.split(",")) if args.only else None
+        print(f"{'scenario':<30} {'p50 ms':>8} {'p99 ms':>8} {'queries':>8} {'peak RSS':>9}")
+        for name, request in scenarios(client, headers, ids).items():
+            if wanted and name not in wanted: continue
+            iterations = max(3, args.iterations // 5) if name == "auth.login" else max(3, args.iterations // 3) if name in ("transactions.all", "export.ndjson") else args.iterations
+            request().raise_for_status()  # warm-up: caches, derivatives, prepared statements
+            latencies, per_request = [], []
+            for _ in range(iterations):
+                before = queries[0]
+                start = time.perf_counter()
+                response = request()
+                latencies.append(time.perf_counter() - start)
+                per_request.append(queries[0] - before)
+                response.raise_for_status()
+            results[name] = {"p50_ms": round(_percentile(latencies, 0.5), 2), "p99_ms": round(_percentile(latencies, 0.99), 2),
+                             "queries": sorted(per_request)[len(per_request) // 2], "peak_rss_mb": round(_rss_mb(), 1)}
+            r = results[name]
+            print(f"{name:<30} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['queries']:>8} {r['peak_rss_mb']:>7.0f}MB")
+
+    baseline_path = os.path.join(BASELINE_DIR, f"{args.scale}.json")
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump({"transactions": transactions, "python": platform.python_version(), "machine": platform.machine(), "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"saved baseline {baseline_path}")
+        return 0
+    if args.transactions or not os.path.exists(baseline_path):
+        print("no baseline to compare against" if not args.transactions else "custom --transactions: not compared with the baseline")
+        return 0
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base: continue
+        if r["p99_ms"] > base["p99_ms"] * (1 + args.tolerance) and r["p99_ms"] - base["p99_ms"] > MIN_SLOWDOWN_MS:
+            regressions.append(f"{name}: p99 {r['p99_ms']:.1f} ms vs baseline {base['p99_ms']:.1f} ms")
+        if r["queries"] > base["queries"]:
+            regressions.append(f"{name}: {r['queries']} queries per request vs baseline {base['queries']}")
+    for line in regressions: print(f"REGRESSION {line}")
+    print(f"{len(regressions)} regression(s) against {baseline_path}" if regressions else f"OK: no regressions against {baseline_path}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,66 @@
+# Query-count check for the aggregated list endpoints: GET /api/lending/ and GET /api/salary/companies must run a
+# fixed number of SQL statements however many rows they return. Seeds N lendings with returns and N companies
+# with salary slips, counts the statements each endpoint runs, doubles the data and counts again; any
+# difference (a per-row lazy load creeping back in) exits 1.
+#   cd backend && python -m bench.check_query_counts [--rows 10]
+import argparse, os, tempfile
+
+ENDPOINTS = ("/api/lending/", "/api/salary/companies")
+
+def seed(client, headers, start: int, count: int):
+    for n in range(start, start + count):
+        client.post("/api/lending/", headers=headers, data={"person_name": f"Person {n}", "total_amount": "1000"}).raise_for_status()
+        loan_id = client.get("/api/lending/", headers=headers).json()[0]["id"]
+        for amount in ("100", "250"):
+            client.post(f"/api/lending/{loan_id}/return", headers=headers, data={"amount": amount}).raise_for_status()
+
+        client.post("/api/salary/companies", headers=headers, data={"name": f"Company {n}", "joining_date": f"2020-01-{n % 28 + 1:02d}"}).raise_for_status()
+        company_id = max(c["id"] for c in client.get("/api/salary/companies", headers=headers).json())
+        for month in ("January", "February"):
+            client.post("/api/salary/slips", headers=headers, data={"company_id": company_id, "amount": "5000", "month": month, "year": "2024"}).raise_for_status()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10, help="Lendings and companies in the first round (N); the second has 2N")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ["CC_TRACK_DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'counts.db')}"
+    os.environ["CC_TRACK_UPLOAD_DIR"] = os.path.join(workdir, "uploads")
+    os.environ["CC_TRACK_REMINDERS_ENABLED"] = "false"
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from app import database
+    from app.main import app
+
+    counted = [0]
+    def count(conn, cursor, statement, parameters, context, executemany):
+        counted[0] += 1
+    for engine in {database.engine, database.read_engine}:
+        event.listen(engine, "before_cursor_execute", count)
+
+    def statements(client, headers, path) -> tuple:
+        client.get(path, headers=headers).raise_for_status()  # warm the token and user caches
+        counted[0] = 0
+        response = client.get(path, headers=headers)
+        response.raise_for_status()
+        return counted[0], len(response.json())
+
+    failures = 0
+    with TestClient(app) as client:
+        token = client.post("/auth/signup", json={"username": "counts", "password": "counts"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        seed(client, headers, 0, args.rows)
+        first = {path: statements(client, headers, path) for path in ENDPOINTS}
+        seed(client, headers, args.rows, args.rows)
+        second = {path: statements(client, headers, path) for path in ENDPOINTS}
+
+    for path in ENDPOINTS:
+        (small, small_rows), (large, large_rows) = first[path], second[path]
+        ok = small == large
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':<5} {path:<26} {small} statements for {small_rows} rows, {large} for {large_rows}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
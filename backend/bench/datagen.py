@@ -0,0 +1,174 @@
+# Synthetic account generator: one user with cards, statements and payments, transactions (some EMI, some
+# with receipts), lending with returns, companies with salary slips and subscriptions, all scaled from the
+# transaction count. Rows go in with executemany; the derived tables are rebuilt at the end, as the cli does.
+#   cd backend && python -m bench.datagen --transactions 20000 [--db /tmp/cc.db --user bench --seed 1]
+import argparse, hashlib, io, os, random, tempfile
+from datetime import datetime, timedelta
+
+SCALES = {"tiny": 10, "small": 1000, "medium": 20000, "large": 200000}
+
+MERCHANTS = ["Swiggy", "Zomato", "Amazon", "Flipkart", "BigBasket", "Uber", "Ola", "IRCTC", "Netflix", "Airtel", "Jio",
+             "Indian Oil", "HP Petrol", "Apollo Pharmacy", "DMart", "Reliance Digital", "Croma", "MakeMyTrip", "BookMyShow", "Starbucks"]
+CITIES = ["Mumbai", "Delhi", "Bengaluru", "Pune", "Chennai", "Hyderabad", "Kolkata", None]
+PEOPLE = ["Rahul", "Priya", "Amit", "Sneha", "Vikram", "Anjali", "Karan", "Neha", "Arjun", "Divya"]
+SUBSCRIPTIONS = [("Netflix", 649), ("Spotify", 119), ("YouTube Premium", 129), ("Amazon Prime", 1499), ("Hotstar", 299),
+                 ("iCloud", 75), ("Google One", 130), ("Gym", 1500), ("Newspaper", 300), ("Broadband", 999)]
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
+
+def _png(color) -> bytes:
+    from PIL import Image
+    out = io.BytesIO()
+    Image.new("RGB", (640, 400), color).save(out, "PNG")
+    return out.getvalue()
+
+def _pdf(n: int) -> bytes:
+    return f"%PDF-1.4\n% cc-track bench receipt {n}\n1 0 obj << /Type /Catalog >> endobj\ntrailer << /Root 1 0 R >>\n%%EOF\n".encode()
+
+def _attachments(upload_dir: str, rng: random.Random, count: int = 12) -> list:
+    # A few distinct blobs under content-addressed names, shared by many rows like real duplicate receipts
+    os.makedirs(upload_dir, exist_ok=True)
+    names = []
+    for n in range(count):
+        data, ext = (_png((rng.randrange(256), rng.randrange(256), rng.randrange(256))), ".png") if n % 2 else (_pdf(n), ".pdf")
+        name = hashlib.sha256(data).hexdigest() + ext
+        with open(os.path.join(upload_dir, name), "wb") as f: f.write(data)
+        names.append(name)
+    return names
+
+def plan(transactions: int) -> dict:
+    # Everything else grows with the transaction count, within what one person plausibly has
+    return {
+        "transactions": transactions,
+        "cards": max(1, min(12, 2 + transactions // 5000)),
+        "months": max(1, min(60, transactions // 200 or 1)),
+        "lending": max(2, min(400, transactions // 500)),
+        "companies": max(1, min(4, 1 + transactions // 50000)),
+        "subscriptions": max(2, min(len(SUBSCRIPTIONS), 2 + transactions // 2000)),
+    }
+
+def generate(username: str = "bench", password: str = "bench", transactions: int = 1000, seed: int = 1, batch: int = 5000) -> dict:
+    # Imported here so callers can point CC_TRACK_DATABASE_URL / CC_TRACK_UPLOAD_DIR at a scratch location first
+    from sqlalchemy import insert, update
+    from app import auth, database, emi, migrations, models, rollups, storage, summary
+
+    migrations.run()
+    rng = random.Random(seed)
+    counts = plan(transactions)
+    now = datetime.now().replace(microsecond=0)
+    start = now - timedelta(days=30 * counts["months"])
+    files = _attachments(storage.UPLOAD_DIR, rng)
+    pdfs = [f for f in files if f.endswith(".pdf")]
+
+    with database.SessionLocal() as db:
+        user = models.User(username=username, hashed_password=auth.get_password_hash(password), currency="INR")
+        db.add(user)
+        db.flush()
+        uid = user.id
+
+        cards = []
+        for n in range(counts["cards"]):
+            number = "".join(rng.choice("0123456789") for _ in range(16))
+            card = models.Card(owner_id=uid, name=f"{rng.choice(['Regalia', 'Millennia', 'Amazon Pay', 'Coral', 'Magnus', 'SimplyClick'])} {n + 1}",
+                               bank_name=rng.choice(["HDFC", "ICICI", "Axis", "SBI", "Kotak"]), card_network=rng.choice(["Visa", "Mastercard", "RuPay"]),
+                               card_type="credit", card_number=number, card_number_last4=number[-4:], expiry_date="12/30", owner_name=username,
+                               limit=rng.choice([50000, 100000, 200000, 500000]), statement_date=rng.randint(1, 28), payment_due_date=rng.randint(1, 28))
+            db.add(card)
+            cards.append(card)
+        db.flush()
+
+        for card in cards:
+            for m in range(counts["months"]):
+                generated = start + timedelta(days=30 * (m + 1))
+                total = round(rng.uniform(2000, card.limit / 4), 2)
+                paid = total if m < counts["months"] - 1 else round(total * rng.random(), 2)
+                stmt = models.CardStatement(card_id=card.id, month=f"{MONTHS[generated.month - 1]} {generated.year}", generated_date=generated,
+                                            due_date=generated + timedelta(days=20), total_due=total, min_due=round(total * 0.05, 2),
+                                            is_paid=paid >= total, paid_amount=paid, attachment_path=rng.choice(pdfs))
+                db.add(stmt)
+                db.flush()
+                parts = rng.randint(1, 3)
+                db.execute(insert(models.StatementPayment), [
+                    {"statement_id": stmt.id, "amount": round(paid / parts, 2), "date": generated + timedelta(days=rng.randint(1, 19)),
+                     "reference": f"UTR{rng.randrange(10**11, 10**12)}", "proof_path": rng.choice(files) if rng.random() < 0.3 else None}
+                    for _ in range(parts)] if paid else [])
+
+        span = (now - start).total_seconds()
+        rows = []
+        for i in range(transactions):
+            merchant = rng.choice(MERCHANTS)
+            credit = rng.random() < 0.08
+            is_emi = not credit and rng.random() < 0.02
+            rows.append({
+                "owner_id": uid, "card_id": rng.choice(cards).id if rng.random() < 0.8 else None,
+                "description": f"{'Refund from ' if credit else ''}{merchant} order #{rng.randrange(10**5, 10**6)}",
+                "amount": round(rng.lognormvariate(6.5, 1.1), 2) * (10 if is_emi else 1), "date": start + timedelta(seconds=rng.uniform(0, span)),
+                "merchant_location": rng.choice(CITIES), "type": "credit" if credit else "expense",
+                "payment_mode": rng.choice(["online", "upi", "card", "cash"]), "is_emi": is_emi, "emi_months": rng.choice([3, 6, 12]) if is_emi else None,
+                "attachment_path": rng.choice(files) if rng.random() < 0.05 else None,
+            })
+            if len(rows) >= batch:
+                db.execute(insert(models.Transaction), rows)
+                rows = []
+        if rows: db.execute(insert(models.Transaction), rows)
+        # A few undated rows, like legacy data (the bulk insert would fill in the date default for None)
+        T = models.Transaction
+        db.execute(update(T).where(T.owner_id == uid, T.id % 1000 == 0).values(date=None))
+
+        for n in range(counts["lending"]):
+            total = round(rng.uniform(500, 50000), -2)
+            lent = start + timedelta(days=rng.uniform(0, (now - start).days))
+            returns = [round(total / 4, 2) for _ in range(rng.randint(0, 4))]
+            loan = models.Lending(owner_id=uid, person_name=f"{rng.choice(PEOPLE)} {n}", total_amount=total, lent_date=lent, is_settled=sum(returns) >= total)
+            db.add(loan)
+            db.flush()
+            if returns:
+                db.execute(insert(models.LendingReturn), [
+                    {"lending_id": loan.id, "amount": amount, "return_date": lent + timedelta(days=7 * (k + 1)), "proof_image_path": rng.choice(files) if rng.random() < 0.3 else None}
+                    for k, amount in enumerate(returns)])
+
+        months_per_company = counts["months"] // counts["companies"] + 1
+        for n in range(counts["companies"]):
+            joined = start + timedelta(days=30 * months_per_company * n)
+            current = n == counts["companies"] - 1
+            company = models.Company(owner_id=uid, name=f"Company {n + 1}", joining_date=joined, is_current=current,
+                                     relieving_date=None if current else joined + timedelta(days=30 * months_per_company))
+            db.add(company)
+            db.flush()
+            salary = rng.randrange(50000, 200000, 1000)
+            slips = []
+            for m in range(months_per_company):
+                when = joined + timedelta(days=30 * m)
+                if when > now: break
+                slips.append({"owner_id": uid, "company_id": company.id, "amount": salary, "month": MONTHS[when.month - 1], "year": when.year,
+                              "attachment_path": rng.choice(pdfs), "date_added": when})
+            if slips: db.execute(insert(models.Salary), slips)
+
+        for name, amount in rng.sample(SUBSCRIPTIONS, counts["subscriptions"]):
+            db.add(models.Subscription(owner_id=uid, name=name, amount=amount, frequency="Monthly", active=rng.random() < 0.9,
+                                       renewal_date=now + timedelta(days=rng.randint(1, 30))))
+        db.flush()
+
+        emi.backfill(db)
+        summary.rebuild(db, uid)
+        rollups.rebuild(db, uid)
+        db.commit()
+    return {"user_id": uid, **counts}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transactions", type=int, help="Transaction count (the other tables scale with it)")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--db", help="SQLite file to fill (default: a new temp file)")
+    parser.add_argument("--user", default="bench")
+    parser.add_argument("--password", default="bench")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["CC_TRACK_DATABASE_URL"] = f"sqlite:///{os.path.abspath(path)}"
+    os.environ.setdefault("CC_TRACK_UPLOAD_DIR", os.path.join(os.path.dirname(os.path.abspath(path)), "uploads"))
+    counts = generate(args.user, args.password, args.transactions or SCALES[args.scale], args.seed)
+    print(f"{path}: user {args.user!r} with " + ", ".join(f"{v} {k}" for k, v in counts.items() if k != "user_id"))
+
+if __name__ == "__main__":
+    main()
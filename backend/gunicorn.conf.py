@@ -0,0 +1,21 @@
+# Multi-process serving:  gunicorn -c gunicorn.conf.py app.main:app   (run from the backend directory)
+# Workers and bind address come from CC_TRACK_WORKERS / CC_TRACK_BIND (see app/config.py). Migrations run once in
+# the master before any worker is forked, so worker startup only finds the schema current.
+from app.config import settings
+
+bind = settings.bind
+workers = settings.workers
+worker_class = "uvicorn.workers.UvicornWorker"
+# Uploads stream to disk and imports can take a while; the default 30 s would kill the worker mid-request
+timeout = 120
+graceful_timeout = 30
+# Each worker imports the app itself, so no connection or thread from the master is shared
+preload_app = False
+
+def on_starting(server):
+    from app import database, migrations
+    applied = migrations.run()
+    if applied: server.log.info("applied migrations: %s", ", ".join(applied))
+    # Connections opened here must not be shared with the forked workers
+    database.engine.dispose()
+    database.read_engine.dispose()
@@ -76,13 +76,13 @@ const CardDetailModal = ({ card, isOpen, onClose, onRefresh, onEdit, onDelete })
                 <div className="w-full aspect-[1.58/1] cursor-pointer group relative" onClick={handleFlip}>
                     {!showBackSide ? (
                         card.front_image_path ? (
-                            <img src={`/uploads/${card.front_image_path}`} className="w-full h-full object-cover rounded-2xl border border-white/10" alt="Front" />
+                            <img src={`/uploads/${card.front_image_path}?size=preview`} className="w-full h-full object-cover rounded-2xl border border-white/10" alt="Front" />
                         ) : (
                             <VirtualCard card={card} isMasked={false} />
                         )
                     ) : (
                         card.back_image_path ? (
-                            <img src={`/uploads/${card.back_image_path}`} className="w-full h-full object-cover rounded-2xl border border-white/10" alt="Back" />
+                            <img src={`/uploads/${card.back_image_path}?size=preview`} className="w-full h-full object-cover rounded-2xl border border-white/10" alt="Back" />
                         ) : (
                             <div className="w-full h-full bg-slate-900 rounded-2xl border border-white/20 flex flex-col justify-center items-center relative">
                                 <div className="w-full h-12 bg-black mt-6 absolute top-0"></div>
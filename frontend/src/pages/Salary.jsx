@@ -112,7 +112,7 @@ const Salary = () => {
                         <button onClick={(e)=>{e.stopPropagation(); handleDelete(comp.id)}} className="p-1 bg-red-900/40 rounded text-red-400"><Trash2 size={12}/></button>
                     </div>
                     <div onClick={() => setSelectedCompany(comp)} className="flex items-center gap-3 mb-3 cursor-pointer">
-                        {comp.logo_path ? <img src={`/uploads/${comp.logo_path}`} className="w-12 h-12 rounded-full object-cover bg-white"/> : <div className="w-12 h-12 rounded-full bg-slate-700 flex items-center justify-center"><Briefcase size={20}/></div>}
+                        {comp.logo_path ? <img src={`/uploads/${comp.logo_path}?size=thumb`} className="w-12 h-12 rounded-full object-cover bg-white"/> : <div className="w-12 h-12 rounded-full bg-slate-700 flex items-center justify-center"><Briefcase size={20}/></div>}
                         <div>
                             <h3 className="font-bold text-white truncate w-40">{comp.name}</h3>
                             <p className="text-[10px] text-slate-400">{new Date(comp.joining_date).getFullYear()} - {comp.is_current ? 'Present' : new Date(comp.relieving_date).getFullYear()}</p>
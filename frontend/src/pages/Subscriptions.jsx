@@ -58,7 +58,7 @@ const Subscriptions = () => {
           <div key={sub.id} className="bg-surface border border-white/5 p-3 rounded-xl flex justify-between items-center hover:bg-white/5 transition-colors">
             <div className="flex items-center gap-3">
               {sub.logo_path ? (
-                  <img src={`/uploads/${sub.logo_path}`} className="w-10 h-10 rounded-lg object-cover bg-white" />
+                  <img src={`/uploads/${sub.logo_path}?size=thumb`} className="w-10 h-10 rounded-lg object-cover bg-white" />
               ) : (
                   <div className="p-2 bg-pink-500/10 rounded-lg text-pink-500"><Repeat size={18} /></div>
               )}
@@ -7,6 +7,7 @@ import FilePreviewModal from '../components/FilePreviewModal';
 
 const Transactions = () => {
   const [txs, setTxs] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [cards, setCards] = useState([]);
   const [showModal, setShowModal] = useState(false);
   const [loading, setLoading] = useState(false);
@@ -27,7 +28,14 @@ const Transactions = () => {
   const fetchData = async () => {
     try {
         const [tRes, cRes] = await Promise.all([api.get('/api/transactions/'), api.get('/api/cards/')]);
-        setTxs(tRes.data); setCards(cRes.data);
+        setTxs(tRes.data.items); setNextCursor(tRes.data.next_cursor); setCards(cRes.data);
+    } catch(e) {}
+  };
+
+  const loadMore = async () => {
+    try {
+        const res = await api.get('/api/transactions/', { params: { cursor: nextCursor } });
+        setTxs([...txs, ...res.data.items]); setNextCursor(res.data.next_cursor);
     } catch(e) {}
   };
 
@@ -105,6 +113,7 @@ const Transactions = () => {
                 </div>
             </div>
         ))}
+        {nextCursor && <Button variant="ghost" className="w-full" onClick={loadMore}>Load more</Button>}
       </div>
 
       <FilePreviewModal isOpen={!!previewFile} fileUrl={previewFile} onClose={()=>setPreviewFile(null)} title="Receipt" />
@@ -81,7 +81,8 @@ User=$REAL_USER
 Group=$REAL_USER
 WorkingDirectory=$PROJECT_DIR/backend
 Environment="PATH=$PROJECT_DIR/backend/venv/bin"
-ExecStart=$PROJECT_DIR/backend/venv/bin/uvicorn app.main:app --host 127.0.0.1 --port 8000
+# Migrations run once in the gunicorn master, then CC_TRACK_WORKERS uvicorn workers are forked
+ExecStart=$PROJECT_DIR/backend/venv/bin/gunicorn -c gunicorn.conf.py app.main:app
 Restart=always
 
 [Install]
@@ -112,6 +113,7 @@ server {
     location /auth {
         proxy_pass http://127.0.0.1:8000;
         proxy_set_header Host \$host;
+        proxy_set_header X-Real-IP \$remote_addr;
     }
     location /uploads {
         proxy_pass http://127.0.0.1:8000;
@@ -54,6 +54,13 @@ pip install -r requirements.txt
 deactivate
 cd ..
 
+# Services installed before multi-worker mode ran uvicorn directly
+SERVICE_FILE="/etc/systemd/system/cc-track.service"
+if [ -f "$SERVICE_FILE" ] && grep -q "bin/uvicorn app.main:app" "$SERVICE_FILE"; then
+    sed -i "s|ExecStart=.*|ExecStart=$PROJECT_DIR/backend/venv/bin/gunicorn -c gunicorn.conf.py app.main:app|" "$SERVICE_FILE"
+    systemctl daemon-reload
+fi
+
 # 5. Frontend
 cd frontend
 if [ "$REAL_USER" == "root" ]; then npm install && npm run build; else sudo -u "$REAL_USER" npm install && sudo -u "$REAL_USER" npm run build; fi
@@ -76,7 +83,10 @@ fi
 
 chown -R "$REAL_USER:$REAL_USER" "$PROJECT_DIR/backend"
 
-# 7. Restart
+# 7. Migrate (against the restored database) and restart
+cd "$PROJECT_DIR/backend"
+if [ "$REAL_USER" == "root" ]; then venv/bin/python -m app.cli migrate; else sudo -u "$REAL_USER" venv/bin/python -m app.cli migrate; fi
+cd ..
 if systemctl list-units --full -all | grep -Fq "cc-track.service"; then systemctl restart cc-track; fi
 
 echo "--- ✅ Update Complete! ---"
\ No newline at end of file